@@ -0,0 +1,321 @@
+import re
+
+import pandas as pd
+
+from column_builder import ColumnBuilder
+from profiling import profiled
+from row_merger import RowMerger
+
+# ---------------------------------------------------
+# 1. Parse ASCII table into raw rows
+# ---------------------------------------------------
+
+def is_border(line):
+    return set(line.replace("|", "").strip()) in [{"-"}, {"="}, set()]
+
+
+def split_row(line):
+    return [c.strip() for c in line.split("|")[1:-1]]
+
+
+def iter_lines(text):
+    """
+    Accept either the result_text string or any iterable of lines (e.g.
+    text_store.MappedText.iter_lines()) so large documents need not be
+    held in memory twice.
+    """
+    return text.splitlines() if isinstance(text, str) else text
+
+
+@profiled
+def parse_ascii_table(text):
+    rows = []
+
+    for line in iter_lines(text):
+        line = line.rstrip()
+
+        # Skip borders
+        if not line.startswith("|"):
+            continue
+        if is_border(line):
+            continue
+
+        rows.append(split_row(line))
+
+    return rows
+
+
+# ---------------------------------------------------
+# 2. Identify header row dynamically
+# ---------------------------------------------------
+
+def is_header_row(row):
+    joined = " ".join(row).lower()
+    return "date" in joined and ("balance" in joined or "amount" in joined)
+
+
+def detect_header(rows):
+    for i, row in enumerate(rows):
+        if is_header_row(row):
+            return i, row
+    raise ValueError("Header row not found")
+
+
+# ---------------------------------------------------
+# 3. Identify important column indices
+# ---------------------------------------------------
+
+def map_columns(headers):
+    col_map = {}
+
+    for i, h in enumerate(headers):
+        hl = h.lower()
+        if "date" in hl and "tran" not in hl:
+            col_map["date"] = i
+        elif any(k in hl for k in ["narration", "description", "details", "particular"]):
+            col_map["desc"] = i
+        elif "debit" in hl:
+            col_map["debit"] = i
+        elif "credit" in hl:
+            col_map["credit"] = i
+        elif "balance" in hl:
+            col_map["balance"] = i
+
+    return col_map
+
+
+# ---------------------------------------------------
+# 4. Merge split rows
+# ---------------------------------------------------
+
+JUNK_KEYWORDS = [
+    "total",
+    "subtotal",
+    "grand total",
+    "b/f",
+    "brought forward",
+    "c/f",
+    "carry forward"
+]
+JUNK_REGEX = re.compile("|".join(re.escape(k) for k in JUNK_KEYWORDS))
+
+
+def _skip_row(row, continuation):
+    row_text = " ".join(row).lower()
+    if continuation:
+        # A "total" line is never merged; it is dropped as junk
+        return "total" in row_text
+    return JUNK_REGEX.search(row_text) is not None
+
+
+@profiled
+def merge_split_rows(rows, col_map):
+    """
+    Continuation rows are recognised from the column-occupancy pattern of
+    this statement's own transaction rows (see row_merger.py), and their
+    text is appended to the previous row's columns.
+    """
+    width = max(col_map.values()) + 1 if col_map else 0
+    rows = [row + [""] * (width - len(row)) for row in rows]
+    return RowMerger(col_map).learn(rows).merge(rows, skip=_skip_row)
+
+
+# ---------------------------------------------------
+# 5. Clean + normalize rows
+# ---------------------------------------------------
+
+@profiled
+def clean_transactions(rows, headers):
+    clean = ColumnBuilder(headers)
+
+    for r in rows:
+        # 🔑 FINAL DEFENSIVE FILTER (ADD HERE)
+        full_text = " ".join(r).lower()
+        if any(k in full_text for k in ["total", "subtotal", "grand total", "b/f", "c/f", "carry forward"]):
+            continue
+
+        if not any(r):
+            continue
+
+        # Remove rows without any amount
+        amt_present = any(re.search(r"\d", r[i]) for i in range(len(r)))
+        if not amt_present:
+            continue
+
+        clean.append(r)
+
+    return clean.to_dataframe()
+
+
+# ---------------------------------------------------
+# 6. Text -> DataFrame
+# ---------------------------------------------------
+
+def parse_transactions(extracted_text):
+    """
+    LLMWhisperer layout_preserving text -> transactions DataFrame
+    """
+    raw_rows = parse_ascii_table(extracted_text)
+
+    header_idx, headers = detect_header(raw_rows)
+    data_rows = raw_rows[header_idx + 1 :]
+
+    col_map = map_columns(headers)
+
+    merged_rows = merge_split_rows(data_rows, col_map)
+
+    return clean_transactions(merged_rows, headers)
+
+
+# ---------------------------------------------------
+# 7. Every table / account section in one pass
+# ---------------------------------------------------
+
+# Digit groups are joined by "-" or a single space before a 4-character
+# group, so "A/c XXXXXXXX3560 16,702.53" stops before the balance
+ACCOUNT_REGEX = re.compile(
+    r"\b(?:A/?C|ACCOUNT)\s*(?:NO\.?|NUMBER|NUM|#)?\s*[:\-]?\s*"
+    r"((?=[X\d \-]{7})[X\d]{4,}(?:-[X\d]{2,}| [X\d]{4}\b)*)",
+    re.IGNORECASE,
+)
+
+
+def normalize_account_number(value):
+    """
+    "1234-5678 90" -> "1234567890". Shared by the table tags and the
+    transaction store's duplicate hash.
+    """
+    return re.sub(r"[\s\-]", "", str(value or "")).upper()
+
+
+class TableStream:
+    """
+    One transaction table found in the text, tagged with the account
+    section it appeared under.
+    """
+
+    def __init__(self, index, account, headers):
+        self.index = index
+        self.account = account
+        self.headers = headers
+        self.rows = []
+
+    @property
+    def tag(self):
+        return f"{self.account or 'Account'}-{self.index + 1}"
+
+
+SECTION_REGEX = re.compile(
+    r"\b(?:summary|overview|reward points|nominee|nomination|disclaimer|important information)\b",
+    re.IGNORECASE,
+)
+# Non-table lines (page footer + next page header) a table may span
+MAX_GAP_LINES = 30
+
+
+def is_section_heading(line):
+    """
+    A non-table line that starts another section ("ACCOUNT SUMMARY",
+    "Reward Points", ...). Account number lines are handled separately.
+    """
+    line = line.strip()
+    return line.startswith("ACCOUNT") or bool(SECTION_REGEX.search(line))
+
+
+def find_tables(text):
+    """
+    Yield a TableStream for every transaction table in `text`, scanning
+    each line once:
+      - an account number line (e.g. "Account No : 1234...") switches the
+        account tag for the tables that follow
+      - a header row opens a new table, unless it repeats the open
+        table's header for the same account (page-break repeat)
+      - data rows go to the open table; rows with a different column
+        count are ignored
+      - a section heading or more than MAX_GAP_LINES lines of other text
+        closes the open table to data rows, so summary boxes that follow
+        are not read as transactions; a repeat of its header reopens it
+    """
+    account = None
+    current = None
+    is_open = False
+    gap = 0
+    count = 0
+
+    for line in iter_lines(text):
+        line = line.rstrip()
+
+        if not line.startswith("|"):
+            match = ACCOUNT_REGEX.search(line)
+            if match:
+                new_account = normalize_account_number(match.group(1))
+                if new_account != account and current is not None:
+                    yield current
+                    current = None
+                account = new_account
+            elif is_section_heading(line):
+                is_open = False
+            elif line.strip() and not line.lstrip().startswith("+"):
+                gap += 1
+                if gap > MAX_GAP_LINES:
+                    is_open = False
+            continue
+
+        gap = 0
+        if is_border(line):
+            continue
+
+        row = split_row(line)
+
+        if is_header_row(row):
+            is_open = True
+            if current is not None and current.headers == row and current.account == account:
+                continue
+            if current is not None:
+                yield current
+            current = TableStream(count, account, row)
+            count += 1
+            continue
+
+        if is_open and current is not None and len(row) == len(current.headers):
+            current.rows.append(row)
+
+    if current is not None:
+        yield current
+
+
+@profiled
+def parse_tables(extracted_text):
+    """
+    All transaction tables -> [(tag, DataFrame)], same cleaning as
+    parse_transactions() applied per table.
+    """
+    tables = []
+    found = False
+    for table in find_tables(extracted_text):
+        found = True
+        merged_rows = merge_split_rows(table.rows, map_columns(table.headers))
+        df = clean_transactions(merged_rows, table.headers)
+        if len(df):
+            tables.append((table.tag, df))
+
+    if not found:
+        raise ValueError("Header row not found")
+    if not tables:
+        raise ValueError("No transactions found")
+    return tables
+
+
+@profiled
+def write_tables(tables, output_excel):
+    """
+    One sheet per table; sheet names are the table tags (Excel allows 31
+    characters).
+    """
+    if not tables:
+        raise ValueError("No transaction tables to write")
+
+    with pd.ExcelWriter(output_excel) as writer:
+        for tag, df in tables:
+            df.to_excel(writer, index=False, sheet_name=tag[-31:])
+    return output_excel
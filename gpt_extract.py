@@ -0,0 +1,128 @@
+import json
+import re
+
+# ==============================
+# GPT table extraction prompt
+# ==============================
+SYSTEM_PROMPT = """
+
+You are a bank statement transaction table extractor.
+
+The document contains ASCII tables using '|' characters.
+Some transaction rows are split across multiple physical lines due to long narration text.
+
+IMPORTANT MERGE RULE:
+- If a row has text ONLY in narration/description-related columns
+  AND other columns like Date, Amount, Balance are empty,
+  THEN this row is a CONTINUATION of the previous transaction.
+- Such rows MUST be merged into the previous row by appending the text
+  to the narration/description column with a space.
+
+Your task:
+1. Locate the MAIN transaction table.
+2. Identify the HEADER ROW exactly as written.
+3. Extract ONLY real transaction rows.
+4. Merge split/continued rows into their correct parent transaction.
+5. Merge tables if they continue across pages.
+
+Strictly ignore:
+- Account summary sections
+- Opening balance / Closing balance
+- B/F, C/F, Balance Forward, Carry Forward
+- Total, Subtotal, Grand Total
+
+Rules:
+- Do NOT invent or rename headers.
+- Preserve column order.
+- Each final row must represent exactly ONE transaction.
+- Output STRICT VALID JSON only.
+- No explanations, no markdown.
+
+"""
+
+
+def build_prompt(text):
+    return f"""
+Below is text extracted from a bank statement.
+
+Important:
+- The transaction table uses '|' separated rows.
+- Some transactions have narration split into multiple rows.
+- A continuation row has empty Date / Amount / Balance columns.
+- Such rows must be merged into the previous transaction.
+
+Instructions:
+- Find the MAIN transaction table.
+- Identify the header row.
+- Use that header to extract transactions.
+- Merge continuation rows into the previous row.
+- Skip balance forward, totals, summaries.
+
+Return JSON EXACTLY in this format:
+
+{{
+  "headers": [...],
+  "rows": [
+    [...],
+    [...]
+  ]
+}}
+
+Text:
+{text}
+"""
+
+
+def chat_request(text, model="gpt-4o"):
+    """
+    Chat completion body for one document (also one line of a batch file).
+    """
+    return {
+        "model": model,
+        "temperature": 0,
+        "messages": [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": build_prompt(text)}
+        ]
+    }
+
+
+def extract_json_from_llm(text):
+    """
+    Removes markdown code fences if present and returns raw JSON string
+    """
+    text = text.strip()
+
+    # Remove ```json or ``` if present
+    if text.startswith("```"):
+        text = re.sub(r"^```(?:json)?", "", text)
+        text = re.sub(r"```$", "", text)
+
+    return text.strip()
+
+
+def extract_with_gpt(openai_client, text, model="gpt-4o"):
+    """
+    One chat completion for one document; returns (headers, rows).
+    """
+    response = openai_client.chat.completions.create(**chat_request(text, model))
+
+    content = response.choices[0].message.content.strip()
+    return parse_llm_output(content)
+
+
+def parse_llm_output(content):
+    try:
+        llm_output = json.loads(extract_json_from_llm(content))
+    except json.JSONDecodeError:
+        raise ValueError("GPT output is not valid JSON:\n" + content)
+
+    headers = llm_output.get("headers")
+    rows = llm_output.get("rows")
+    if not headers:
+        raise RuntimeError("LLM could not identify a header row.")
+
+    if not rows:
+        raise RuntimeError("Header found but no transaction rows extracted.")
+
+    return headers, rows
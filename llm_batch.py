@@ -0,0 +1,310 @@
+import argparse
+import json
+import os
+import time
+
+import pandas as pd
+
+from ascii_parser import write_tables
+from gpt_extract import chat_request, parse_llm_output
+from text_store import MappedText
+
+# ---------------------------------------------------
+# Offline GPT extraction through the OpenAI Batch API
+#
+#   python llm_batch.py submit dataset output     # whisper + submit, returns
+#   python llm_batch.py collect output --wait     # later: fetch + write Excel
+#
+# The build_prompt() requests for many documents go into one JSONL file
+# (custom_id = document name) and are submitted as a single batch job,
+# billed at the batch rate and processed within the completion window.
+# Submitted batches are recorded in output/.batch/batches.json, so
+# `collect` can run from another process, hours later, and map every
+# headers/rows payload back to its document.
+# ---------------------------------------------------
+
+ENDPOINT = "/v1/chat/completions"
+COMPLETION_WINDOW = "24h"
+# API limits are 50,000 requests and 200 MB per input file
+MAX_BATCH_REQUESTS = 50000
+MAX_BATCH_BYTES = 190 * 1024 * 1024
+TERMINAL_STATUS = {"completed", "failed", "expired", "cancelled"}
+
+
+def _manifest_path(work_dir):
+    return os.path.join(work_dir, "batches.json")
+
+
+def load_manifest(work_dir):
+    try:
+        with open(_manifest_path(work_dir), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return []
+
+
+def pending_documents(work_dir):
+    """
+    custom_ids of batches that were submitted but not collected yet.
+    """
+    return {
+        custom_id
+        for entry in load_manifest(work_dir)
+        if not entry["collected"]
+        for custom_id in entry["documents"]
+    }
+
+
+def save_manifest(work_dir, manifest):
+    tmp = f"{_manifest_path(work_dir)}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, _manifest_path(work_dir))
+
+
+# ---------------------------------------------------
+# 1. Request files
+# ---------------------------------------------------
+
+def request_line(custom_id, text, model="gpt-4o"):
+    return json.dumps({
+        "custom_id": custom_id,
+        "method": "POST",
+        "url": ENDPOINT,
+        "body": chat_request(text, model),
+    }) + "\n"
+
+
+def write_request_files(documents, work_dir, model="gpt-4o"):
+    """
+    documents: [(custom_id, text_path)]. Writes one or more JSONL request
+    files within the per-batch limits; returns [(path, [custom_id])].
+    """
+    os.makedirs(work_dir, exist_ok=True)
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    files = []
+    f = None
+
+    for custom_id, text_path in documents:
+        with MappedText(text_path) as doc:
+            line = request_line(custom_id, doc.text(), model).encode("utf-8")
+
+        if f is None or len(ids) >= MAX_BATCH_REQUESTS or size + len(line) > MAX_BATCH_BYTES:
+            if f is not None:
+                f.close()
+            path = os.path.join(work_dir, f"{stamp}-{len(files) + 1}.requests.jsonl")
+            f = open(path, "wb")
+            ids = []
+            size = 0
+            files.append((path, ids))
+
+        f.write(line)
+        ids.append(custom_id)
+        size += len(line)
+
+    if f is not None:
+        f.close()
+    return files
+
+
+# ---------------------------------------------------
+# 2. Submit
+# ---------------------------------------------------
+
+def submit_batches(openai_client, documents, work_dir, model="gpt-4o"):
+    """
+    documents: [(custom_id, text_path, output_excel)]. Uploads the request
+    file(s), creates the batch job(s) and records them in the manifest.
+    Returns the new manifest entries.
+    """
+    outputs = {custom_id: output_excel for custom_id, _, output_excel in documents}
+    manifest = load_manifest(work_dir)
+    entries = []
+
+    for path, ids in write_request_files(
+        [(custom_id, text_path) for custom_id, text_path, _ in documents], work_dir, model
+    ):
+        with open(path, "rb") as f:
+            uploaded = openai_client.files.create(file=f, purpose="batch")
+        batch = openai_client.batches.create(
+            input_file_id=uploaded.id,
+            endpoint=ENDPOINT,
+            completion_window=COMPLETION_WINDOW,
+        )
+        entry = {
+            "id": batch.id,
+            "input_file_id": uploaded.id,
+            "request_file": path,
+            "documents": {custom_id: outputs[custom_id] for custom_id in ids},
+            "collected": False,
+        }
+        manifest.append(entry)
+        entries.append(entry)
+        save_manifest(work_dir, manifest)
+        print(f"📤 batch {batch.id}: {len(ids)} documents")
+
+    return entries
+
+
+# ---------------------------------------------------
+# 3. Collect
+# ---------------------------------------------------
+
+def read_results(openai_client, file_id):
+    """
+    Yield (custom_id, content, error) for every line of a batch output or
+    error file.
+    """
+    if not file_id:
+        return
+    content = openai_client.files.content(file_id).text
+    for line in content.splitlines():
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        response = record.get("response") or {}
+        body = response.get("body") or {}
+
+        if record.get("error") or response.get("status_code") != 200:
+            error = record.get("error") or body.get("error") or f"HTTP {response.get('status_code')}"
+            yield record["custom_id"], None, error
+            continue
+
+        yield record["custom_id"], body["choices"][0]["message"]["content"], None
+
+
+def collect_batch(openai_client, entry):
+    """
+    Write an Excel file for every document of a finished batch. Returns
+    {custom_id: output_excel or error message}.
+    """
+    batch = openai_client.batches.retrieve(entry["id"])
+    results = {}
+
+    for file_id in (batch.output_file_id, batch.error_file_id):
+        for custom_id, content, error in read_results(openai_client, file_id):
+            if custom_id not in entry["documents"]:
+                continue
+            if error is None:
+                try:
+                    headers, rows = parse_llm_output(content.strip())
+                    df = pd.DataFrame(rows, columns=headers)
+                    results[custom_id] = write_tables([("Transactions", df)], entry["documents"][custom_id])
+                    continue
+                except (ValueError, RuntimeError) as e:
+                    error = str(e)
+            results[custom_id] = f"error: {error}"
+
+    # Documents the batch never got to (expired / cancelled / failed)
+    for custom_id in entry["documents"]:
+        results.setdefault(custom_id, f"error: batch {batch.status}")
+    return results
+
+
+def collect(openai_client, work_dir, wait=False, poll_interval=60, timeout=24 * 3600):
+    """
+    Collect every uncollected batch in the manifest. Without `wait` only
+    batches that have already finished are collected.
+    """
+    manifest = load_manifest(work_dir)
+    deadline = time.monotonic() + timeout
+    results = {}
+
+    while True:
+        pending = 0
+        for entry in manifest:
+            if entry["collected"]:
+                continue
+            batch = openai_client.batches.retrieve(entry["id"])
+            if batch.status not in TERMINAL_STATUS:
+                pending += 1
+                counts = batch.request_counts
+                done = f" {counts.completed + counts.failed}/{counts.total}" if counts else ""
+                print(f"⏳ batch {entry['id']}: {batch.status}{done}")
+                continue
+
+            batch_results = collect_batch(openai_client, entry)
+            entry["collected"] = True
+            entry["status"] = batch.status
+            save_manifest(work_dir, manifest)
+            results.update(batch_results)
+            for custom_id, result in batch_results.items():
+                mark = "❌" if result.startswith("error:") else "✅"
+                print(f"{mark} {custom_id} -> {result}")
+
+        if pending == 0 or not wait:
+            return results
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"{pending} batch(es) still running after {timeout}s")
+        time.sleep(poll_interval)
+
+
+# ---------------------------------------------------
+# LLMWhisperer text for a dataset
+# ---------------------------------------------------
+
+def whisper_documents(client, pdf_paths, output_dir, in_flight=4, poll_interval=5):
+    """
+    Run the submit/wait stages of pipeline.py only; returns
+    [(name, text_path, output_excel)].
+    """
+    import pipeline
+
+    stages = pipeline.document_stages(client, output_dir, in_flight=in_flight,
+                                      poll_interval=poll_interval)[:2]
+    documents = []
+    for job in pipeline.run_pipeline(((p, p) for p in pdf_paths), stages):
+        if job.error is not None:
+            print(f"❌ {job.key} failed in {job.failed_stage}: {job.error}")
+            continue
+        text_path, output_excel = job.value
+        documents.append((os.path.splitext(os.path.basename(output_excel))[0], text_path, output_excel))
+    return documents
+
+
+# ---------------------------------------------------
+# USAGE
+#   python llm_batch.py submit dataset output
+#   python llm_batch.py collect output [--wait]
+# ---------------------------------------------------
+
+if __name__ == "__main__":
+    from openai import OpenAI
+
+    import whisper_client
+
+    parser = argparse.ArgumentParser(description="Batch GPT extraction for non-urgent statements")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_submit = sub.add_parser("submit")
+    p_submit.add_argument("dataset")
+    p_submit.add_argument("output")
+    p_submit.add_argument("--model", default="gpt-4o")
+    p_submit.add_argument("--in-flight", type=int, default=4)
+
+    p_collect = sub.add_parser("collect")
+    p_collect.add_argument("output")
+    p_collect.add_argument("--wait", action="store_true")
+    p_collect.add_argument("--poll-interval", type=float, default=60)
+
+    args = parser.parse_args()
+    openai_client = OpenAI(api_key=os.environ.get("OpenAI_API_Key"))
+
+    if args.command == "submit":
+        os.makedirs(args.output, exist_ok=True)
+        work_dir = os.path.join(args.output, ".batch")
+        in_flight = pending_documents(work_dir)
+        pdfs = sorted(
+            os.path.join(args.dataset, f)
+            for f in os.listdir(args.dataset)
+            if f.lower().endswith(".pdf")
+            and os.path.splitext(f)[0] not in in_flight
+            and not os.path.exists(os.path.join(args.output, f"{os.path.splitext(f)[0]}.xlsx"))
+        )
+        if in_flight:
+            print(f"⏭️  {len(in_flight)} document(s) already in uncollected batches")
+        documents = whisper_documents(whisper_client.make_client(), pdfs, args.output, args.in_flight)
+        submit_batches(openai_client, documents, work_dir, args.model)
+    else:
+        collect(openai_client, os.path.join(args.output, ".batch"),
+                wait=args.wait, poll_interval=args.poll_interval)
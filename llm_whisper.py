@@ -40,68 +40,51 @@ result = client.whisper(file_path=r'dataset\AllahabadBank_1.pdf',mode="table",
 while True:
     status = client.whisper_status(whisper_hash=result['whisper_hash'])
     if status['status'] == 'processed':
-        resultx = client.whisper_retrieve(whisper_hash=result['whisper_hash'])
         break
     time.sleep(5)
 
-extracted_text = resultx['extraction']['result_text']
+# result_text is streamed to disk and read line by line (text_store.py)
+from text_store import MappedText, retrieve_to_file
 
-# print(extracted_text)
+text_path = retrieve_to_file(client, result['whisper_hash'], "alhabad_bank_llmwhishperer.txt")
 
 
 import pandas as pd
 import re
 
-def extract_transaction_table(text):
-    lines = text.splitlines()
-
-    transactions = []
-    capture = False
-
-    for line in lines:
-        line = line.rstrip()
-
-        # Start capturing after header
-        if re.search(r"\|\s*Date\s*\|\s*Transaction Details", line):
-            capture = True
-            continue
+from ascii_parser import clean_transactions, find_tables, map_columns, merge_split_rows, write_tables
 
-        # Stop if section ends
-        if capture and line.strip().startswith("ACCOUNT"):
-            break
+def extract_transaction_tables(text):
+    """
+    Every "Date | Transaction Details" table in the text, one per
+    account section, in a single pass (see ascii_parser.find_tables)
+    """
+    tables = []
 
-        # Skip borders and empty lines
-        if not capture:
-            continue
-        if line.strip().startswith("+") or line.strip() == "":
+    for table in find_tables(text):
+        if len(table.headers) != 5 or "transaction details" not in " ".join(table.headers).lower():
             continue
 
-        # Must be a table row
-        if line.startswith("|"):
-            cols = [c.strip() for c in line.split("|")[1:-1]]
-
-            if len(cols) == 5:
-                date, details, debit, credit, balance = cols
-
-                transactions.append({
-                    "Date": date,
-                    "Transaction Details": details,
-                    "Debit": debit,
-                    "Credit": credit,
-                    "Balance": balance
-                })
+        headers = ["Date", "Transaction Details", "Debit", "Credit", "Balance"]
+        rows = merge_split_rows(table.rows, map_columns(headers))
+        transactions = clean_transactions(rows, headers)
+        if len(transactions):
+            tables.append((table.tag, transactions))
 
-    return pd.DataFrame(transactions)
+    return tables
 
 
 
 # -------------------------------
 # Your extracted text
 # -------------------------------
-df = extract_transaction_table(extracted_text)
+with MappedText(text_path) as doc:
+    tables = extract_transaction_tables(doc.iter_lines())
 
-# Save to Excel
-df.to_excel("alhabad_bank_llmwhishperer.xlsx", index=False)
+# Save to Excel, one sheet per account table
+write_tables(tables, "alhabad_bank_llmwhishperer.xlsx")
 
 print("alhabad_bank_llmwhishperer.xlsx")
-print(df.head())
+for tag, df in tables:
+    print(tag)
+    print(df.head())
@@ -7,6 +7,9 @@ from unstract.llmwhisperer.client_v2 import LLMWhispererClientException
 from openai import OpenAI
 import os
 
+from gpt_extract import SYSTEM_PROMPT, build_prompt, parse_llm_output
+from text_store import MappedText, retrieve_to_file
+
 # ==============================
 # CONFIG
 # ==============================
@@ -36,103 +39,19 @@ while True:
         whisper_hash=result["whisper_hash"]
     )
     if status["status"] == "processed":
-        resultx = whisper_client.whisper_retrieve(
-            whisper_hash=result["whisper_hash"]
-        )
         break
     time.sleep(5)
 
-extracted_text = resultx["extraction"]["result_text"]
+# result_text is streamed to disk (text_store.py); the prompt needs all of it
+TEXT_PATH = os.path.splitext(OUTPUT_EXCEL)[0] + ".txt"
+retrieve_to_file(whisper_client, result["whisper_hash"], TEXT_PATH)
+with MappedText(TEXT_PATH) as doc:
+    extracted_text = doc.text()
 print("Text extraction completed.")
 # print(extracted_text)
 
 # ==============================
-# STEP 2: Build LLM Prompt
-# ==============================
-SYSTEM_PROMPT = """
-
-You are a bank statement transaction table extractor.
-
-The document contains ASCII tables using '|' characters.
-Some transaction rows are split across multiple physical lines due to long narration text.
-
-IMPORTANT MERGE RULE:
-- If a row has text ONLY in narration/description-related columns
-  AND other columns like Date, Amount, Balance are empty,
-  THEN this row is a CONTINUATION of the previous transaction.
-- Such rows MUST be merged into the previous row by appending the text
-  to the narration/description column with a space.
-
-Your task:
-1. Locate the MAIN transaction table.
-2. Identify the HEADER ROW exactly as written.
-3. Extract ONLY real transaction rows.
-4. Merge split/continued rows into their correct parent transaction.
-5. Merge tables if they continue across pages.
-
-Strictly ignore:
-- Account summary sections
-- Opening balance / Closing balance
-- B/F, C/F, Balance Forward, Carry Forward
-- Total, Subtotal, Grand Total
-
-Rules:
-- Do NOT invent or rename headers.
-- Preserve column order.
-- Each final row must represent exactly ONE transaction.
-- Output STRICT VALID JSON only.
-- No explanations, no markdown.
-
-"""
-
-
-def build_prompt(text):
-    return f"""
-Below is text extracted from a bank statement.
-
-Important:
-- The transaction table uses '|' separated rows.
-- Some transactions have narration split into multiple rows.
-- A continuation row has empty Date / Amount / Balance columns.
-- Such rows must be merged into the previous transaction.
-
-Instructions:
-- Find the MAIN transaction table.
-- Identify the header row.
-- Use that header to extract transactions.
-- Merge continuation rows into the previous row.
-- Skip balance forward, totals, summaries.
-
-Return JSON EXACTLY in this format:
-
-{{
-  "headers": [...],
-  "rows": [
-    [...],
-    [...]
-  ]
-}}
-
-Text:
-{text}
-"""
-
-
-def extract_json_from_llm(text):
-    """
-    Removes markdown code fences if present and returns raw JSON string
-    """
-    text = text.strip()
-
-    # Remove ```json or ``` if present
-    if text.startswith("```"):
-        text = re.sub(r"^```(?:json)?", "", text)
-        text = re.sub(r"```$", "", text)
-
-    return text.strip()
-
-# ==============================
-# STEP 3: Call GPT-4o
+# STEP 2/3: Build prompt (gpt_extract.py) and call GPT-4o
 # ==============================
 print("Sending text to GPT-4o...")
 
@@ -152,19 +71,7 @@ content = response.choices[0].message.content.strip()
 # ==============================
 # STEP 4: Parse JSON safely
 # ==============================
-try:
-    clean_content = extract_json_from_llm(content)
-    llm_output = json.loads(clean_content)
-except json.JSONDecodeError:
-    raise ValueError("GPT output is not valid JSON:\n" + content)
-
-headers = llm_output.get("headers")
-rows = llm_output.get("rows")
-if not headers:
-    raise RuntimeError("LLM could not identify a header row.")
-
-if not rows:
-    raise RuntimeError("Header found but no transaction rows extracted.")
+headers, rows = parse_llm_output(content)
 
 # ==============================
 # STEP 5: Convert to Excel
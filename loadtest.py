@@ -0,0 +1,170 @@
+import argparse
+import os
+import tempfile
+import time
+
+from openai import OpenAI
+
+import llm_batch
+import mock_servers
+import pipeline
+import whisper_client
+
+# ---------------------------------------------------
+# Load test: drive the batch pipeline against the local mock servers
+# and report throughput plus p50/p99 per stage.
+#
+#   python loadtest.py --docs 200 --in-flight 16 --failure-rate 0.02 \
+#       --rate-limit 50 --gpt
+#   python loadtest.py --docs 200 --batch      # OpenAI Batch API mode
+# ---------------------------------------------------
+
+
+def make_dummy_pdfs(directory, count):
+    # The mock never looks inside the upload; a small body per file is enough
+    paths = []
+    for i in range(count):
+        path = os.path.join(directory, f"doc_{i:05d}.pdf")
+        with open(path, "wb") as f:
+            f.write(b"%PDF-1.4\n% load test document\n%%EOF\n")
+        paths.append(path)
+    return paths
+
+
+def run_loadtest(docs=50, in_flight=8, parse_workers=2, write_workers=2,
+                 use_gpt=False, llm_workers=8, whisper_config=None,
+                 openai_config=None, poll_interval=0.2, texts=None):
+    whisperer = mock_servers.start_whisperer(whisper_config, texts=texts)
+    openai_server = mock_servers.start_openai(openai_config) if use_gpt else None
+
+    # Keep the retry backoff in proportion to the mock's latencies
+    whisper_client.RETRY_BACKOFF = 0.1
+
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            pdfs = make_dummy_pdfs(workdir, docs)
+            output_dir = os.path.join(workdir, "output")
+            os.makedirs(output_dir)
+
+            client = whisper_client.make_client(
+                api_key="loadtest", base_url=f"{whisperer.url}/api/v2", logging_level="WARNING"
+            )
+            openai_client = None
+            if use_gpt:
+                openai_client = OpenAI(api_key="loadtest", base_url=f"{openai_server.url}/v1")
+
+            stages = pipeline.document_stages(
+                client, output_dir,
+                in_flight=in_flight,
+                parse_workers=parse_workers,
+                write_workers=write_workers,
+                poll_interval=poll_interval,
+                openai_client=openai_client,
+                llm_workers=llm_workers,
+            )
+
+            start = time.perf_counter()
+            jobs = pipeline.run_pipeline(((p, p) for p in pdfs), stages)
+            wall = time.perf_counter() - start
+    finally:
+        whisperer.stop()
+        if openai_server is not None:
+            openai_server.stop()
+
+    print(pipeline.stage_report(jobs, stages, wall))
+    print(f"LLMWhisperer mock requests: {whisperer.stats.counts}")
+    if openai_server is not None:
+        print(f"OpenAI mock requests:       {openai_server.stats.counts}")
+    return jobs
+
+
+def run_batch_loadtest(docs=50, in_flight=8, whisper_config=None, openai_config=None,
+                       poll_interval=0.2, texts=None):
+    """
+    llm_batch.py end to end: whisper every document, submit one batch,
+    poll until it finishes and write the Excel files.
+    """
+    whisperer = mock_servers.start_whisperer(whisper_config, texts=texts)
+    openai_server = mock_servers.start_openai(openai_config)
+    whisper_client.RETRY_BACKOFF = 0.1
+
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            pdfs = make_dummy_pdfs(workdir, docs)
+            output_dir = os.path.join(workdir, "output")
+            os.makedirs(output_dir)
+
+            client = whisper_client.make_client(
+                api_key="loadtest", base_url=f"{whisperer.url}/api/v2", logging_level="WARNING"
+            )
+            openai_client = OpenAI(api_key="loadtest", base_url=f"{openai_server.url}/v1")
+            batch_dir = os.path.join(output_dir, ".batch")
+
+            start = time.perf_counter()
+            documents = llm_batch.whisper_documents(client, pdfs, output_dir, in_flight, poll_interval)
+            whispered = time.perf_counter()
+            llm_batch.submit_batches(openai_client, documents, batch_dir)
+            results = llm_batch.collect(openai_client, batch_dir, wait=True, poll_interval=poll_interval)
+            done = time.perf_counter()
+    finally:
+        whisperer.stop()
+        openai_server.stop()
+
+    failed = sum(1 for r in results.values() if r.startswith("error:"))
+    print(f"{docs} documents: whisper {whispered - start:.1f}s, batch {done - whispered:.1f}s, "
+          f"{len(results) - failed} written, {failed} failed")
+    print(f"LLMWhisperer mock requests: {whisperer.stats.counts}")
+    print(f"OpenAI mock requests:       {openai_server.stats.counts}")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pipeline load test against local mocks")
+    parser.add_argument("--docs", type=int, default=50)
+    parser.add_argument("--in-flight", type=int, default=8)
+    parser.add_argument("--parse-workers", type=int, default=2)
+    parser.add_argument("--write-workers", type=int, default=2)
+    parser.add_argument("--gpt", action="store_true", help="use the OpenAI mock instead of the rule parser")
+    parser.add_argument("--batch", action="store_true", help="use the OpenAI Batch API mock (llm_batch.py)")
+    parser.add_argument("--llm-workers", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.05, help="median response latency (s)")
+    parser.add_argument("--processing", type=float, default=1.0, help="median whisper processing time (s)")
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit", type=float, default=None, help="requests/s before 429s")
+    parser.add_argument("--texts", help="directory of recorded result_text .txt files")
+    args = parser.parse_args()
+
+    whisper_config = mock_servers.MockConfig(
+        latency_median=args.latency,
+        processing_median=args.processing,
+        failure_rate=args.failure_rate,
+        rate_limit=args.rate_limit,
+    )
+    openai_config = mock_servers.MockConfig(
+        latency_median=args.latency * 20,
+        failure_rate=args.failure_rate,
+        rate_limit=args.rate_limit,
+    )
+
+    texts = mock_servers.load_texts(args.texts) if args.texts else None
+    if args.batch:
+        run_batch_loadtest(
+            docs=args.docs,
+            in_flight=args.in_flight,
+            whisper_config=whisper_config,
+            openai_config=openai_config,
+            texts=texts,
+        )
+        raise SystemExit
+
+    run_loadtest(
+        docs=args.docs,
+        in_flight=args.in_flight,
+        parse_workers=args.parse_workers,
+        write_workers=args.write_workers,
+        use_gpt=args.gpt,
+        llm_workers=args.llm_workers,
+        whisper_config=whisper_config,
+        openai_config=openai_config,
+        texts=texts,
+    )
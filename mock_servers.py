@@ -0,0 +1,576 @@
+import json
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from ascii_parser import detect_header, map_columns, merge_split_rows, parse_ascii_table
+
+# ---------------------------------------------------
+# Local stand-ins for LLMWhisperer v2 and OpenAI chat completions
+#
+# Both speak enough of the real wire format for LLMWhispererClientV2 and
+# the openai client to work unchanged when pointed at them:
+#   LLMWhisperer: POST /api/v2/whisper, GET /api/v2/whisper-status,
+#                 GET /api/v2/whisper-retrieve
+#   OpenAI:       POST /v1/chat/completions, POST /v1/files,
+#                 GET /v1/files/{id}/content, POST /v1/batches,
+#                 GET /v1/batches/{id}
+# ---------------------------------------------------
+
+
+class MockConfig:
+    """
+    latency_median / latency_sigma - lognormal response latency (seconds)
+    processing_median / _sigma      - time until a whisper job is processed
+    failure_rate                    - share of requests answered with 500
+    rate_limit                      - requests per second before 429s
+                                      (token bucket, burst = rate_limit);
+                                      None disables it
+    retry_after                     - Retry-After header on 429s (seconds)
+    """
+
+    def __init__(self, latency_median=0.05, latency_sigma=0.5,
+                 processing_median=2.0, processing_sigma=0.5,
+                 failure_rate=0.0, rate_limit=None, retry_after=1, seed=None):
+        self.latency_median = latency_median
+        self.latency_sigma = latency_sigma
+        self.processing_median = processing_median
+        self.processing_sigma = processing_sigma
+        self.failure_rate = failure_rate
+        self.rate_limit = rate_limit
+        self.retry_after = retry_after
+        self.random = random.Random(seed)
+
+    def latency(self):
+        if self.latency_median <= 0:
+            return 0.0
+        return self.random.lognormvariate(0, self.latency_sigma) * self.latency_median
+
+    def processing_time(self):
+        if self.processing_median <= 0:
+            return 0.0
+        return self.random.lognormvariate(0, self.processing_sigma) * self.processing_median
+
+
+class TokenBucket:
+    def __init__(self, rate):
+        self.rate = rate
+        self.tokens = rate
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def take(self):
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+
+# ---------------------------------------------------
+# Synthetic / recorded result_text
+# ---------------------------------------------------
+
+MODES = ["UPI", "NEFT", "IMPS", "ATM", "POS", "CHEQUE"]
+
+
+def synthetic_statement(n_rows=60, seed=0, wrap_every=3):
+    """
+    LLMWhisperer-style layout_preserving text with one ASCII transaction
+    table; every `wrap_every`-th narration continues on a second row.
+    """
+    rng = random.Random(seed)
+    balance = 100000.0
+    border = "+------------+--------------------------------+------------+------------+-------------+"
+    lines = [
+        "STATEMENT OF ACCOUNT",
+        "",
+        border,
+        "| Date       | Narration                      | Debit      | Credit     | Balance     |",
+        border,
+    ]
+    for i in range(n_rows):
+        amount = round(rng.uniform(10, 5000), 2)
+        debit = rng.random() < 0.6
+        balance += -amount if debit else amount
+        mode = rng.choice(MODES)
+        lines.append(
+            f"| {i % 28 + 1:02d}-{i // 28 % 12 + 1:02d}-2024 | {mode}/{rng.randrange(10**11):011d}/PAYMENT".ljust(46)
+            + f"| {amount if debit else '':>10} | {'' if debit else amount:>10} | {balance:>11.2f} |"
+        )
+        if wrap_every and i % wrap_every == 0:
+            lines.append(f"|            | MERCHANT {rng.randrange(10**6):06d}/REF".ljust(46) + "|            |            |             |")
+    lines.append(border)
+    return "\n".join(lines) + "\n"
+
+
+def load_texts(directory):
+    """
+    Recorded result_text files (*.txt) to replay instead of synthetic ones.
+    """
+    return [
+        open(os.path.join(directory, f), encoding="utf-8").read()
+        for f in sorted(os.listdir(directory))
+        if f.endswith(".txt")
+    ]
+
+
+def parse_pages(spec):
+    """
+    pages_to_extract "1-3,7" -> [1, 2, 3, 7]
+    """
+    pages = []
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        start, _, end = part.partition("-")
+        pages.extend(range(int(start), int(end or start) + 1))
+    return pages
+
+
+def completion_for_prompt(prompt):
+    """
+    Answer a build_prompt() request the way GPT is asked to: parse the
+    table in the prompt text and return {"headers", "rows"} JSON.
+    """
+    text = prompt.split("Text:", 1)[-1]
+    try:
+        rows = parse_ascii_table(text)
+        header_idx, headers = detect_header(rows)
+        merged = merge_split_rows(rows[header_idx + 1:], map_columns(headers))
+    except (ValueError, KeyError):
+        headers, merged = [], []
+    return json.dumps({"headers": headers, "rows": merged})
+
+
+# ---------------------------------------------------
+# HTTP handlers
+# ---------------------------------------------------
+
+class MockHandler(BaseHTTPRequestHandler):
+    server_version = "MockAPI/1.0"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def _send_json(self, code, payload, headers=None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            return self.rfile.read(length)
+        if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int(self.rfile.readline().strip() or b"0", 16)
+                if size == 0:
+                    self.rfile.readline()
+                    return b"".join(chunks)
+                chunks.append(self.rfile.read(size))
+                self.rfile.readline()
+        return b""
+
+    def _gate(self):
+        """
+        Common latency / 429 / 500 behaviour. Returns False when the
+        request has already been answered with an error.
+        """
+        cfg = self.server.config
+        stats = self.server.stats
+        time.sleep(cfg.latency())
+
+        if self.server.bucket is not None and not self.server.bucket.take():
+            stats.count("429")
+            self._send_json(429, self.rate_limit_body(),
+                            {"Retry-After": str(cfg.retry_after)})
+            return False
+        if cfg.failure_rate and cfg.random.random() < cfg.failure_rate:
+            stats.count("500")
+            self._send_json(500, self.error_body("Injected failure"))
+            return False
+        return True
+
+    def rate_limit_body(self):
+        return self.error_body("Rate limit exceeded")
+
+    def error_body(self, message):
+        return {"message": message}
+
+
+class Stats:
+    def __init__(self):
+        self.counts = {}
+        self.lock = threading.Lock()
+
+    def count(self, key):
+        with self.lock:
+            self.counts[key] = self.counts.get(key, 0) + 1
+
+
+class WhispererHandler(MockHandler):
+    def do_POST(self):
+        url = urlparse(self.path)
+        body = self._read_body()
+        if url.path.rstrip("/").endswith("/whisper"):
+            self.server.stats.count("whisper")
+            if not self._gate():
+                return
+            whisper_hash = uuid.uuid4().hex
+            texts = self.server.texts
+            pages = parse_pages(parse_qs(url.query).get("pages_to_extract", [""])[0])
+            with self.server.lock:
+                n = len(self.server.jobs)
+                if pages:
+                    # One synthetic page per requested page, "<<<\f" after each
+                    text = "".join(synthetic_statement(seed=p) + "<<<\f\n" for p in pages)
+                else:
+                    text = texts[n % len(texts)] if texts else synthetic_statement(seed=n)
+                self.server.jobs[whisper_hash] = {
+                    "ready_at": time.monotonic() + self.server.config.processing_time(),
+                    "text": text,
+                    "size": len(body),
+                }
+            self._send_json(202, {
+                "message": "Whisper Job Accepted",
+                "status": "processing",
+                "whisper_hash": whisper_hash,
+            })
+            return
+        self._send_json(404, self.error_body(f"Unknown path {url.path}"))
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        whisper_hash = parse_qs(url.query).get("whisper_hash", [""])[0]
+        job = self.server.jobs.get(whisper_hash)
+
+        if url.path.endswith("/whisper-status"):
+            self.server.stats.count("whisper-status")
+            if not self._gate():
+                return
+            if job is None:
+                self._send_json(400, self.error_body("Invalid whisper_hash"))
+                return
+            ready = time.monotonic() >= job["ready_at"]
+            self._send_json(200, {
+                "status": "processed" if ready else "processing",
+                "whisper_hash": whisper_hash,
+                "detail": [],
+            })
+            return
+
+        if url.path.endswith("/whisper-retrieve"):
+            self.server.stats.count("whisper-retrieve")
+            if not self._gate():
+                return
+            if job is None or time.monotonic() < job["ready_at"]:
+                self._send_json(400, self.error_body("Whisper job not processed"))
+                return
+            self._send_json(200, {
+                "result_text": job["text"],
+                "confidence_metadata": [],
+                "metadata": {},
+                "webhook_metadata": "",
+            })
+            return
+
+        self._send_json(404, self.error_body(f"Unknown path {url.path}"))
+
+
+class OpenAIHandler(MockHandler):
+    def error_body(self, message):
+        return {"error": {"message": message, "type": "server_error", "code": None}}
+
+    def rate_limit_body(self):
+        return {"error": {"message": "Rate limit reached", "type": "requests",
+                          "code": "rate_limit_exceeded"}}
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        body = self._read_body()
+
+        if url.path.endswith("/chat/completions"):
+            self.server.stats.count("chat.completions")
+            if not self._gate():
+                return
+            request = json.loads(body or b"{}")
+            self._send_json(200, self.chat_completion(request))
+            return
+
+        if url.path.endswith("/files"):
+            self.server.stats.count("files.create")
+            if not self._gate():
+                return
+            self._send_json(200, self.create_file(body))
+            return
+
+        if url.path.endswith("/batches"):
+            self.server.stats.count("batches.create")
+            if not self._gate():
+                return
+            request = json.loads(body or b"{}")
+            if request.get("input_file_id") not in self.server.files:
+                self._send_json(400, self.error_body("Invalid input_file_id"))
+                return
+            self._send_json(200, self.create_batch(request))
+            return
+
+        self._send_json(404, self.error_body(f"Unknown path {url.path}"))
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        parts = url.path.rstrip("/").split("/")
+
+        if len(parts) >= 2 and parts[-2] == "batches":
+            self.server.stats.count("batches.retrieve")
+            if not self._gate():
+                return
+            batch = self.batch_status(parts[-1])
+            if batch is None:
+                self._send_json(404, self.error_body(f"No batch {parts[-1]}"))
+                return
+            self._send_json(200, batch)
+            return
+
+        if len(parts) >= 3 and parts[-3] == "files" and parts[-1] == "content":
+            self.server.stats.count("files.content")
+            if not self._gate():
+                return
+            stored = self.server.files.get(parts[-2])
+            if stored is None:
+                self._send_json(404, self.error_body(f"No file {parts[-2]}"))
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "application/octet-stream")
+            self.send_header("Content-Length", str(len(stored["content"])))
+            self.end_headers()
+            self.wfile.write(stored["content"])
+            return
+
+        self._send_json(404, self.error_body(f"Unknown path {url.path}"))
+
+    def chat_completion(self, request):
+        messages = request.get("messages", [])
+        prompt = messages[-1]["content"] if messages else ""
+        completions = self.server.completions
+        if completions:
+            with self.server.lock:
+                n = self.server.completion_index
+                self.server.completion_index += 1
+            content = completions[n % len(completions)]
+        else:
+            content = completion_for_prompt(prompt)
+
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex[:24]}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "gpt-4o"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": len(prompt) // 4,
+                "completion_tokens": len(content) // 4,
+                "total_tokens": (len(prompt) + len(content)) // 4,
+            },
+        }
+
+
+    # -- Batch API --------------------------------------------------
+
+    def store_file(self, content, filename, purpose):
+        file_id = f"file-{uuid.uuid4().hex[:24]}"
+        info = {
+            "id": file_id,
+            "object": "file",
+            "bytes": len(content),
+            "created_at": int(time.time()),
+            "filename": filename,
+            "purpose": purpose,
+            "status": "processed",
+        }
+        with self.server.lock:
+            self.server.files[file_id] = {"info": info, "content": content}
+        return info
+
+    def create_file(self, body):
+        # multipart/form-data with "purpose" and "file" fields
+        message = BytesParser(policy=HTTP).parsebytes(
+            f"Content-Type: {self.headers.get('Content-Type')}\r\n\r\n".encode() + body
+        )
+        fields = {}
+        filename = "upload.jsonl"
+        for part in message.iter_parts():
+            name = part.get_param("name", header="content-disposition")
+            fields[name] = part.get_payload(decode=True)
+            if name == "file":
+                filename = part.get_filename() or filename
+        purpose = fields.get("purpose", b"batch").decode()
+        return self.store_file(fields.get("file", b""), filename, purpose)
+
+    def create_batch(self, request):
+        batch_id = f"batch_{uuid.uuid4().hex[:24]}"
+        now = int(time.time())
+        requests = self.server.files[request["input_file_id"]]["content"].splitlines()
+        batch = {
+            "id": batch_id,
+            "object": "batch",
+            "endpoint": request.get("endpoint", "/v1/chat/completions"),
+            "errors": None,
+            "input_file_id": request["input_file_id"],
+            "completion_window": request.get("completion_window", "24h"),
+            "status": "in_progress",
+            "output_file_id": None,
+            "error_file_id": None,
+            "created_at": now,
+            "in_progress_at": now,
+            "expires_at": now + 24 * 3600,
+            "completed_at": None,
+            "request_counts": {"total": len([r for r in requests if r.strip()]), "completed": 0, "failed": 0},
+            "metadata": request.get("metadata"),
+        }
+        with self.server.lock:
+            self.server.batches[batch_id] = {
+                "batch": batch,
+                "ready_at": time.monotonic() + self.server.config.processing_time(),
+            }
+        return batch
+
+    def batch_status(self, batch_id):
+        with self.server.lock:
+            entry = self.server.batches.get(batch_id)
+        if entry is None:
+            return None
+        batch = entry["batch"]
+        with self.server.lock:
+            run = (batch["status"] == "in_progress" and not entry.get("running")
+                   and time.monotonic() >= entry["ready_at"])
+            entry["running"] = entry.get("running") or run
+        if run:
+            self.run_batch(batch)
+        return batch
+
+    def run_batch(self, batch):
+        """
+        Answer every request line; injected failures go to the error file.
+        """
+        cfg = self.server.config
+        output, errors = [], []
+        content = self.server.files[batch["input_file_id"]]["content"]
+
+        for line in content.decode("utf-8").splitlines():
+            if not line.strip():
+                continue
+            request = json.loads(line)
+            record = {"id": f"batch_req_{uuid.uuid4().hex[:24]}", "custom_id": request["custom_id"], "error": None}
+            if cfg.failure_rate and cfg.random.random() < cfg.failure_rate:
+                record["response"] = {"status_code": 500, "request_id": uuid.uuid4().hex,
+                                      "body": self.error_body("Injected failure")}
+                errors.append(record)
+            else:
+                record["response"] = {"status_code": 200, "request_id": uuid.uuid4().hex,
+                                      "body": self.chat_completion(request.get("body", {}))}
+                output.append(record)
+
+        for key, records in (("output_file_id", output), ("error_file_id", errors)):
+            if records:
+                data = "".join(json.dumps(r) + "\n" for r in records).encode("utf-8")
+                batch[key] = self.store_file(data, f"{batch['id']}_{key[:-8]}.jsonl", "batch_output")["id"]
+
+        batch["request_counts"] = {"total": len(output) + len(errors),
+                                   "completed": len(output), "failed": len(errors)}
+        batch["status"] = "completed"
+        batch["completed_at"] = int(time.time())
+
+
+# ---------------------------------------------------
+# Server lifecycle
+# ---------------------------------------------------
+
+class MockServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, handler, config=None, host="127.0.0.1", port=0,
+                 texts=None, completions=None):
+        super().__init__((host, port), handler)
+        self.config = config or MockConfig()
+        self.bucket = TokenBucket(self.config.rate_limit) if self.config.rate_limit else None
+        self.stats = Stats()
+        self.lock = threading.Lock()
+        self.jobs = {}
+        self.texts = texts or []
+        self.completions = completions or []
+        self.completion_index = 0
+        self.files = {}
+        self.batches = {}
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def start_whisperer(config=None, port=0, texts=None):
+    """
+    Returns a running server; the client base_url is server.url + "/api/v2".
+    """
+    return MockServer(WhispererHandler, config, port=port, texts=texts).start()
+
+
+def start_openai(config=None, port=0, completions=None):
+    """
+    Returns a running server; the client base_url is server.url + "/v1".
+    """
+    return MockServer(OpenAIHandler, config, port=port, completions=completions).start()
+
+
+# ---------------------------------------------------
+# USAGE
+#   python mock_servers.py [whisper_port] [openai_port] [recorded_texts_dir]
+# ---------------------------------------------------
+
+if __name__ == "__main__":
+    whisper_port = int(sys.argv[1]) if len(sys.argv) > 1 else 8801
+    openai_port = int(sys.argv[2]) if len(sys.argv) > 2 else 8802
+    texts = load_texts(sys.argv[3]) if len(sys.argv) > 3 else None
+
+    whisperer = start_whisperer(port=whisper_port, texts=texts)
+    openai_server = start_openai(port=openai_port)
+    print(f"LLMWhisperer mock: {whisperer.url}/api/v2")
+    print(f"OpenAI mock:       {openai_server.url}/v1")
+
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        whisperer.stop()
+        openai_server.stop()
@@ -1,14 +1,237 @@
 import pdfplumber
 import pandas as pd
+import os
 import re
+import sys
 from collections import defaultdict
 
-def extract_transactions_from_pdf(pdf_path, output_excel_path):
+from column_builder import ColumnBuilder
+from transaction_store import TransactionStore
+from word_columns import extract_word_table
+from profiling import profile_document, profiled
+from page_cache import page_hash
+from ascii_parser import ACCOUNT_REGEX, normalize_account_number
+
+# Part of the page cache key: bump when extract_page_transactions()
+# changes what it returns for the same page
+EXTRACTOR_VERSION = 2
+
+TRANSACTION_HEADERS = ['DATE', 'MODE', 'PARTICULARS', 'DEPOSITS', 'WITHDRAWALS', 'BALANCE']
+
+LINE_TABLE_SETTINGS = {
+    "vertical_strategy": "lines",
+    "horizontal_strategy": "lines",
+    "snap_tolerance": 3,
+    "join_tolerance": 3,
+    "edge_min_length": 3,
+    "min_words_vertical": 3,
+    "min_words_horizontal": 1,
+    "intersection_tolerance": 15,
+}
+
+
+def find_header_row(table):
+    """
+    Index of the DATE/PARTICULARS header within the first 3 rows, or -1
+    """
+    for i, row in enumerate(table[:3]):
+        if row:
+            row_str = ' '.join([str(cell).upper() if cell else '' for cell in row])
+            if 'DATE' in row_str and 'PARTICULARS' in row_str:
+                return i
+    return -1
+
+
+@profiled
+def extract_page_tables(page, strategy="auto"):
+    """
+    (tables, strategy used) for one page
+
+    strategy:
+      "lines" - pdfplumber ruling-line intersections
+      "words" - word-geometry column clustering (statements without rules)
+      "auto"  - lines first, words when the ruled tables hold no more
+                than one row under a transaction header (pages where only
+                the header box is ruled)
+    """
+    if strategy == "words":
+        return [extract_word_table(page)], "words"
+    
+    tables = page.extract_tables(LINE_TABLE_SETTINGS)
+    
+    ruled_rows = max(
+        (len(t) - find_header_row(t) - 1 for t in tables if t and find_header_row(t) >= 0),
+        default=0,
+    )
+    
+    if strategy == "auto" and ruled_rows <= 1:
+        word_table = extract_word_table(page)
+        if word_table:
+            print("No ruled transaction table - using word geometry")
+            return [word_table], "words"
+    
+    return tables, "lines"
+
+
+@profiled
+def write_transactions_excel(df, output_excel_path):
+    """
+    Formatted Transactions sheet
+    """
+    with pd.ExcelWriter(output_excel_path, engine='openpyxl') as writer:
+        df.to_excel(writer, index=False, sheet_name='Transactions')
+        
+        worksheet = writer.sheets['Transactions']
+        
+        # Column widths
+        worksheet.column_dimensions['A'].width = 12
+        worksheet.column_dimensions['B'].width = 20
+        worksheet.column_dimensions['C'].width = 70
+        worksheet.column_dimensions['D'].width = 15
+        worksheet.column_dimensions['E'].width = 15
+        worksheet.column_dimensions['F'].width = 15
+        
+        # Formatting
+        from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
+        
+        header_fill = PatternFill(start_color="4CAF50", end_color="4CAF50", fill_type="solid")
+        header_font = Font(bold=True, color="FFFFFF", size=11)
+        thin_border = Border(
+            left=Side(style='thin'),
+            right=Side(style='thin'),
+            top=Side(style='thin'),
+            bottom=Side(style='thin')
+        )
+        
+        for cell in worksheet[1]:
+            cell.fill = header_fill
+            cell.font = header_font
+            cell.alignment = Alignment(horizontal='center', vertical='center')
+            cell.border = thin_border
+        
+        for row in worksheet.iter_rows(min_row=2, max_row=worksheet.max_row):
+            row[0].alignment = Alignment(horizontal='left', vertical='top')
+            row[1].alignment = Alignment(horizontal='left', vertical='top')
+            row[2].alignment = Alignment(horizontal='left', vertical='top', wrap_text=True)
+            row[3].alignment = Alignment(horizontal='right', vertical='top')
+            row[4].alignment = Alignment(horizontal='right', vertical='top')
+            row[5].alignment = Alignment(horizontal='right', vertical='top')
+            
+            for cell in row:
+                cell.border = thin_border
+
+
+def extract_page_transactions(page, strategy="auto"):
+    """
+    (transaction rows in TRANSACTION_HEADERS order, strategy used) for one page
+    """
+    rows = []
+    
+    tables, strategy = extract_page_tables(page, strategy)
+    
+    print(f"Found {len(tables)} table(s)")
+    
+    for table_idx, table in enumerate(tables):
+        if not table or len(table) < 1:
+            continue
+        
+        print(f"\nTable {table_idx + 1}: {len(table)} rows, {len(table[0]) if table else 0} columns")
+        
+        # Check if this is a transaction table (look for DATE column)
+        header_idx = find_header_row(table)
+        
+        if header_idx < 0:
+            print(f"  Skipping - not a transaction table")
+            continue
+        
+        print(f"  Transaction table header at row {header_idx}")
+        
+        # Extract transactions
+        rows_extracted = 0
+        
+        for row_idx in range(header_idx + 1, len(table)):
+            row = table[row_idx]
+            
+            if not row or len(row) < 3:
+                continue
+            
+            # Check if first column contains a date
+            first_cell = str(row[0]) if row[0] else ""
+            date_match = re.search(r'\d{2}-\d{2}-\d{4}', first_cell)
+            
+            if not date_match:
+                continue
+            
+            date = date_match.group()
+            
+            # Extract other columns
+            mode = ""
+            particulars = ""
+            deposits = ""
+            withdrawals = ""
+            balance = ""
+            
+            if len(row) >= 2:
+                mode = str(row[1]) if row[1] and str(row[1]) != 'None' else ""
+                mode = mode.replace('\n', ' ').strip()
+            
+            if len(row) >= 3:
+                particulars = str(row[2]) if row[2] and str(row[2]) != 'None' else ""
+                particulars = particulars.replace('\n', ' ').strip()
+            
+            if len(row) >= 4:
+                deposits = str(row[3]) if row[3] and str(row[3]) != 'None' else ""
+                deposits = deposits.replace('\n', ' ').strip()
+            
+            if len(row) >= 5:
+                withdrawals = str(row[4]) if row[4] and str(row[4]) != 'None' else ""
+                withdrawals = withdrawals.replace('\n', ' ').strip()
+            
+            if len(row) >= 6:
+                balance = str(row[5]) if row[5] and str(row[5]) != 'None' else ""
+                balance = balance.replace('\n', ' ').strip()
+            
+            rows.append([date, mode, particulars, deposits, withdrawals, balance])
+            rows_extracted += 1
+            
+            # Debug: show first 3
+            if rows_extracted <= 3:
+                print(f"    {date} | {particulars[:50]}...")
+        
+        print(f"  Extracted {rows_extracted} transactions")
+    
+    return rows, strategy
+
+
+def find_account_number(pdf_path, max_pages=2):
+    """
+    Account number printed on the statement ("Savings A/c XXXXXXXX3560"),
+    from the first pages' text; None when there is none.
+    """
+    with pdfplumber.open(pdf_path) as pdf:
+        for page in pdf.pages[:max_pages]:
+            match = ACCOUNT_REGEX.search(page.extract_text() or "")
+            if match:
+                return normalize_account_number(match.group(1))
+    return None
+
+
+def extract_transactions_from_pdf(pdf_path, output_excel_path, strategy="auto", cache=None):
     """
     Extract transaction details from bank statement PDF
+
+    With a page_cache.PageCache, pages whose content hash was seen before
+    reuse their cached rows instead of being extracted again.
+
+    "auto" is settled by the first page that yields transactions; later
+    pages run only that extractor and go back to "auto" when it finds
+    nothing, so a statement's layout is probed once, not on every page.
     """
     
-    transactions = []
+    transactions = ColumnBuilder(TRANSACTION_HEADERS)
+    reused = 0
+    page_strategy = strategy
+    cache_kind = f"pdfplumber-{pdfplumber.__version__}-v{EXTRACTOR_VERSION}-{strategy}"
     
     with pdfplumber.open(pdf_path) as pdf:
         print(f"Processing {len(pdf.pages)} page(s)...\n")
@@ -16,105 +239,27 @@ def extract_transactions_from_pdf(pdf_path, output_excel_path):
         for page_num, page in enumerate(pdf.pages, 1):
             print(f"--- Page {page_num} ---")
             
-            # Method 1: Use implicit table detection (best for tables with clear structure)
-            tables = page.extract_tables({
-                "vertical_strategy": "lines",
-                "horizontal_strategy": "lines",
-                "snap_tolerance": 3,
-                "join_tolerance": 3,
-                "edge_min_length": 3,
-                "min_words_vertical": 3,
-                "min_words_horizontal": 1,
-                "intersection_tolerance": 15,
-            })
+            rows = None
+            if cache is not None:
+                key = page_hash(page)
+                rows = cache.get(cache_kind, key)
             
-            print(f"Found {len(tables)} table(s)")
+            if rows is None:
+                rows, used = extract_page_transactions(page, page_strategy)
+                if not rows and page_strategy != strategy:
+                    rows, used = extract_page_transactions(page, strategy)
+                if rows and strategy == "auto":
+                    page_strategy = used
+                if cache is not None:
+                    cache.put(cache_kind, key, rows)
+            else:
+                reused += 1
+                print(f"Unchanged page - reusing {len(rows)} cached transactions")
             
-            for table_idx, table in enumerate(tables):
-                if not table or len(table) < 1:
-                    continue
-                
-                print(f"\nTable {table_idx + 1}: {len(table)} rows, {len(table[0]) if table else 0} columns")
-                
-                # Check if this is a transaction table (look for DATE column)
-                is_transaction_table = False
-                header_idx = -1
-                
-                for i, row in enumerate(table[:3]):  # Check first 3 rows
-                    if row:
-                        row_str = ' '.join([str(cell).upper() if cell else '' for cell in row])
-                        if 'DATE' in row_str and 'PARTICULARS' in row_str:
-                            is_transaction_table = True
-                            header_idx = i
-                            print(f"  Transaction table header at row {i}")
-                            break
-                
-                if not is_transaction_table:
-                    print(f"  Skipping - not a transaction table")
-                    continue
-                
-                # Extract transactions
-                rows_extracted = 0
-                
-                for row_idx in range(header_idx + 1, len(table)):
-                    row = table[row_idx]
-                    
-                    if not row or len(row) < 3:
-                        continue
-                    
-                    # Check if first column contains a date
-                    first_cell = str(row[0]) if row[0] else ""
-                    date_match = re.search(r'\d{2}-\d{2}-\d{4}', first_cell)
-                    
-                    if not date_match:
-                        continue
-                    
-                    date = date_match.group()
-                    
-                    # Extract other columns
-                    mode = ""
-                    particulars = ""
-                    deposits = ""
-                    withdrawals = ""
-                    balance = ""
-                    
-                    if len(row) >= 2:
-                        mode = str(row[1]) if row[1] and str(row[1]) != 'None' else ""
-                        mode = mode.replace('\n', ' ').strip()
-                    
-                    if len(row) >= 3:
-                        particulars = str(row[2]) if row[2] and str(row[2]) != 'None' else ""
-                        particulars = particulars.replace('\n', ' ').strip()
-                    
-                    if len(row) >= 4:
-                        deposits = str(row[3]) if row[3] and str(row[3]) != 'None' else ""
-                        deposits = deposits.replace('\n', ' ').strip()
-                    
-                    if len(row) >= 5:
-                        withdrawals = str(row[4]) if row[4] and str(row[4]) != 'None' else ""
-                        withdrawals = withdrawals.replace('\n', ' ').strip()
-                    
-                    if len(row) >= 6:
-                        balance = str(row[5]) if row[5] and str(row[5]) != 'None' else ""
-                        balance = balance.replace('\n', ' ').strip()
-                    
-                    transaction = {
-                        'DATE': date,
-                        'MODE': mode,
-                        'PARTICULARS': particulars,
-                        'DEPOSITS': deposits,
-                        'WITHDRAWALS': withdrawals,
-                        'BALANCE': balance
-                    }
-                    
-                    transactions.append(transaction)
-                    rows_extracted += 1
-                    
-                    # Debug: show first 3
-                    if rows_extracted <= 3:
-                        print(f"    {date} | {particulars[:50]}...")
-                
-                print(f"  Extracted {rows_extracted} transactions")
+            transactions.extend(rows)
+    
+    if cache is not None:
+        print(f"\n♻️  {reused} page(s) reused from cache")
     
     # If no transactions found, try debugging
     if len(transactions) == 0:
@@ -203,7 +348,7 @@ def extract_transactions_from_pdf(pdf_path, output_excel_path):
         return None
     
     # Create DataFrame
-    df = pd.DataFrame(transactions)
+    df = transactions.to_dataframe()
     
     # Clean data
     df = df.replace('None', '')
@@ -211,47 +356,7 @@ def extract_transactions_from_pdf(pdf_path, output_excel_path):
     df = df.reset_index(drop=True)
     
     # Save to Excel
-    with pd.ExcelWriter(output_excel_path, engine='openpyxl') as writer:
-        df.to_excel(writer, index=False, sheet_name='Transactions')
-        
-        worksheet = writer.sheets['Transactions']
-        
-        # Column widths
-        worksheet.column_dimensions['A'].width = 12
-        worksheet.column_dimensions['B'].width = 20
-        worksheet.column_dimensions['C'].width = 70
-        worksheet.column_dimensions['D'].width = 15
-        worksheet.column_dimensions['E'].width = 15
-        worksheet.column_dimensions['F'].width = 15
-        
-        # Formatting
-        from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
-        
-        header_fill = PatternFill(start_color="4CAF50", end_color="4CAF50", fill_type="solid")
-        header_font = Font(bold=True, color="FFFFFF", size=11)
-        thin_border = Border(
-            left=Side(style='thin'),
-            right=Side(style='thin'),
-            top=Side(style='thin'),
-            bottom=Side(style='thin')
-        )
-        
-        for cell in worksheet[1]:
-            cell.fill = header_fill
-            cell.font = header_font
-            cell.alignment = Alignment(horizontal='center', vertical='center')
-            cell.border = thin_border
-        
-        for row in worksheet.iter_rows(min_row=2, max_row=worksheet.max_row):
-            row[0].alignment = Alignment(horizontal='left', vertical='top')
-            row[1].alignment = Alignment(horizontal='left', vertical='top')
-            row[2].alignment = Alignment(horizontal='left', vertical='top', wrap_text=True)
-            row[3].alignment = Alignment(horizontal='right', vertical='top')
-            row[4].alignment = Alignment(horizontal='right', vertical='top')
-            row[5].alignment = Alignment(horizontal='right', vertical='top')
-            
-            for cell in row:
-                cell.border = thin_border
+    write_transactions_excel(df, output_excel_path)
     
     print(f"\n✅ Successfully extracted {len(df)} transactions")
     print(f"✅ Excel file saved: {output_excel_path}")
@@ -259,11 +364,15 @@ def extract_transactions_from_pdf(pdf_path, output_excel_path):
     return df
 
 if __name__ == "__main__":
-    pdf_file = "transaction.pdf"
-    excel_file = "bank_transactions_final1121.xlsx"
+    # python new2.py [statement.pdf] [output.xlsx] [account_no]
+    pdf_file = sys.argv[1] if len(sys.argv) > 1 else "transaction.pdf"
+    excel_file = sys.argv[2] if len(sys.argv) > 2 else "bank_transactions_final1121.xlsx"
+    # Account number used for cross-statement dedup: given, or read off the statement
+    account_no = sys.argv[3] if len(sys.argv) > 3 else None
     
     try:
-        df = extract_transactions_from_pdf(pdf_file, excel_file)
+        with profile_document(os.path.splitext(os.path.basename(pdf_file))[0]):
+            df = extract_transactions_from_pdf(pdf_file, excel_file)
         
         if df is not None and len(df) > 0:
             print("\n" + "="*100)
@@ -282,6 +391,16 @@ if __name__ == "__main__":
             print("\n" + "="*100)
             print(f"✅ Total: {len(df)} transactions")
             print(f"✅ Period: {df['DATE'].iloc[0]} to {df['DATE'].iloc[-1]}")
+            
+            # Keep every statement in one store so overlapping months dedup
+            account_no = account_no or find_account_number(pdf_file)
+            if account_no:
+                with TransactionStore("transactions.db") as store:
+                    inserted, dupes = store.add_dataframe(df, account_no, source=pdf_file)
+                print(f"✅ Store ({account_no}): {inserted} new, {dupes} already seen")
+            else:
+                print("⚠️  No account number on the statement - pass it as the third "
+                      "argument to add these transactions to the store")
         
     except FileNotFoundError:
         print(f"❌ PDF file not found: '{pdf_file}'")
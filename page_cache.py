@@ -0,0 +1,273 @@
+import argparse
+import hashlib
+import json
+import os
+import threading
+
+from pdfminer.pdftypes import PDFStream, resolve1
+
+# ---------------------------------------------------
+# Per-page content hashing + page-level extraction cache
+#
+# Banks reissue statements with pages appended or one page corrected.
+# Every page is hashed from what it draws (content streams, fonts'
+# encodings, images and forms it uses, page box, rotation), and
+# extraction results are cached under that hash:
+#
+#   .page_cache/pdfplumber-<version>-v1-auto/ab/ab12....json      rows of one page
+#   .page_cache/whisper-table-layout_preserving/cd/cd34....json   result_text of one page
+#
+# The cache is content-addressed, so a page shared by two files (the
+# original and the reissue) is extracted once. Only pages with a new hash
+# go to pdfplumber or LLMWhisperer; the rest come from the cache and the
+# document is re-stitched in page order.
+# ---------------------------------------------------
+
+CACHE_DIR = ".page_cache"
+
+
+def _object_bytes(obj, seen):
+    """
+    Bytes of a PDF object with references resolved: decoded data for
+    streams, sorted entries for dictionaries, repr() for the rest.
+    """
+    obj = resolve1(obj)
+    if isinstance(obj, (PDFStream, dict)):
+        if id(obj) in seen:
+            return
+        seen.add(id(obj))
+    if isinstance(obj, PDFStream):
+        yield obj.get_data()
+    elif isinstance(obj, list):
+        for item in obj:
+            yield from _object_bytes(item, seen)
+    elif isinstance(obj, dict):
+        for key in sorted(obj):
+            yield str(key).encode()
+            yield from _object_bytes(obj[key], seen)
+    else:
+        yield repr(obj).encode()
+
+
+def _hash_resources(h, resources, seen):
+    """
+    Fonts (name, Encoding, ToUnicode) and XObjects of a resource
+    dictionary; Form XObjects' own resources are followed recursively.
+    """
+    resources = resolve1(resources) or {}
+
+    fonts = resolve1(resources.get("Font")) or {}
+    for name in sorted(fonts):
+        font = resolve1(fonts[name]) or {}
+        h.update(f"Font {name}".encode())
+        for key in ("BaseFont", "Encoding", "ToUnicode"):
+            if key in font:
+                h.update(key.encode())
+                for data in _object_bytes(font[key], seen):
+                    h.update(data)
+
+    xobjects = resolve1(resources.get("XObject")) or {}
+    for name in sorted(xobjects):
+        xobject = resolve1(xobjects[name])
+        h.update(f"XObject {name}".encode())
+        if not isinstance(xobject, PDFStream) or id(xobject) in seen:
+            continue
+        for data in _object_bytes(xobject, seen):
+            h.update(data)
+        if "Resources" in xobject.attrs:
+            _hash_resources(h, xobject.attrs["Resources"], seen)
+
+
+def page_hash(page):
+    """
+    sha256 of a pdfplumber page's content streams, fonts (encoding and
+    ToUnicode maps), XObjects (images / forms, with the forms' own
+    resources), page box and rotation.
+    """
+    page_obj = page.page_obj
+    h = hashlib.sha256()
+    h.update(repr((list(page_obj.mediabox), page_obj.rotate)).encode())
+
+    seen = set()
+    for data in _object_bytes(page_obj.attrs.get("Contents", []), seen):
+        h.update(data)
+    _hash_resources(h, page_obj.resources, seen)
+
+    return h.hexdigest()
+
+
+def pdf_page_hashes(pdf_path):
+    import pdfplumber
+
+    with pdfplumber.open(pdf_path) as pdf:
+        return [page_hash(page) for page in pdf.pages]
+
+
+class PageCache:
+    def __init__(self, cache_dir=CACHE_DIR):
+        self.cache_dir = cache_dir
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, kind, key):
+        return os.path.join(self.cache_dir, kind, key[:2], f"{key}.json")
+
+    def contains(self, kind, key):
+        return os.path.exists(self._path(kind, key))
+
+    def get(self, kind, key):
+        try:
+            with open(self._path(kind, key), encoding="utf-8") as f:
+                value = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return value
+
+    def put(self, kind, key, value):
+        path = self._path(kind, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(value, f)
+        os.replace(tmp, path)
+
+
+# ---------------------------------------------------
+# LLMWhisperer: only changed pages are sent
+# ---------------------------------------------------
+
+def _page_ranges(pages):
+    """
+    [1, 2, 3, 7, 9, 10] -> "1-3,7,9-10" (pages_to_extract format)
+    """
+    parts = []
+    start = prev = None
+    for p in pages:
+        if prev is not None and p == prev + 1:
+            prev = p
+            continue
+        if start is not None:
+            parts.append(f"{start}-{prev}" if prev != start else str(start))
+        start = prev = p
+    if start is not None:
+        parts.append(f"{start}-{prev}" if prev != start else str(start))
+    return ",".join(parts)
+
+
+def _whisper_kind(mode, output_mode):
+    # A page's text depends on the extraction options
+    return f"whisper-{mode}-{output_mode}"
+
+
+def _ended(page_text):
+    # Every page ends with a newline, so the next page's first line is
+    # never glued to this page's last one when pages are stitched
+    return page_text if not page_text or page_text.endswith("\n") else page_text + "\n"
+
+
+def _whisper_full(client, pdf_path, text_path, poll_interval, timeout, mode, output_mode):
+    import whisper_client
+
+    whisper_hash = whisper_client.submit(client, pdf_path, mode=mode, output_mode=output_mode)
+    return whisper_client.wait_for_result_file(client, whisper_hash, text_path, poll_interval, timeout)
+
+
+def whisper_text_incremental(client, pdf_path, cache, text_path, poll_interval=5, timeout=600,
+                             mode=None, output_mode=None):
+    """
+    Write the full result_text of `pdf_path` to `text_path` (indexed for
+    text_store.MappedText), extracting only pages whose hash is not
+    cached. Table state (header, account section) spans pages, so the
+    cached unit is the page's text; re-parsing the stitched text is cheap
+    next to the LLMWhisperer round trip. New pages are streamed to disk
+    and the document is stitched one page at a time.
+    """
+    import whisper_client
+    from text_store import MappedText, build_index, remove_text
+
+    mode = mode or whisper_client.MODE
+    output_mode = output_mode or whisper_client.OUTPUT_MODE
+    kind = _whisper_kind(mode, output_mode)
+    hashes = pdf_page_hashes(pdf_path)
+    missing = [i for i, h in enumerate(hashes) if not cache.contains(kind, h)]
+
+    if missing:
+        print(f"Extracting {len(missing)}/{len(hashes)} page(s) with LLMWhisperer...")
+        whisper_hash = whisper_client.submit(
+            client, pdf_path, pages_to_extract=_page_ranges([i + 1 for i in missing]),
+            mode=mode, output_mode=output_mode,
+        )
+        new_path = whisper_client.wait_for_result_file(
+            client, whisper_hash, f"{text_path}.new", poll_interval, timeout
+        )
+        try:
+            with MappedText(new_path) as doc:
+                got = doc.page_count
+                matched = got == len(missing)
+                if matched:
+                    for page, i in enumerate(missing):
+                        cache.put(kind, hashes[i], _ended(doc.page_text(page)))
+        finally:
+            remove_text(new_path)
+
+        if not matched:
+            # Cannot tell which text belongs to which page: use it whole, cache nothing
+            print(f"⚠️  expected {len(missing)} page(s), got {got} - re-extracting all pages")
+            return _whisper_full(client, pdf_path, text_path, poll_interval, timeout, mode, output_mode)
+
+    tmp = f"{text_path}.part"
+    text = ""
+    with open(tmp, "w", encoding="utf-8", newline="") as f:
+        for h in hashes:
+            text = cache.get(kind, h)
+            if text is None:
+                break
+            f.write(_ended(text))
+    if text is None:
+        # A cache entry vanished or is corrupt
+        os.unlink(tmp)
+        return _whisper_full(client, pdf_path, text_path, poll_interval, timeout, mode, output_mode)
+    os.replace(tmp, text_path)
+    build_index(text_path)
+
+    print(f"♻️  {len(hashes) - len(missing)} page(s) reused from cache")
+    return text_path
+
+
+def extract_incremental(pdf_path, output_excel, engine="pdfplumber", cache=None, client=None):
+    cache = cache or PageCache()
+
+    if engine == "pdfplumber":
+        from new2 import extract_transactions_from_pdf
+        return extract_transactions_from_pdf(pdf_path, output_excel, cache=cache)
+
+    import whisper_client
+    from ascii_parser import parse_tables, write_tables
+    from text_store import MappedText, remove_text
+
+    client = client or whisper_client.make_client()
+    text_path = whisper_text_incremental(client, pdf_path, cache, f"{os.path.splitext(output_excel)[0]}.txt")
+    try:
+        with MappedText(text_path) as doc:
+            tables = parse_tables(doc.iter_lines())
+    finally:
+        remove_text(text_path)
+    return write_tables(tables, output_excel)
+
+
+# ---------------------------------------------------
+# USAGE
+#   python page_cache.py statement.pdf output.xlsx [--engine whisper]
+# ---------------------------------------------------
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Re-extract only the pages of a PDF that changed")
+    parser.add_argument("pdf")
+    parser.add_argument("output")
+    parser.add_argument("--engine", choices=["pdfplumber", "whisper"], default="pdfplumber")
+    parser.add_argument("--cache", default=CACHE_DIR)
+    args = parser.parse_args()
+
+    extract_incremental(args.pdf, args.output, args.engine, PageCache(args.cache))
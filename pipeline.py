@@ -0,0 +1,284 @@
+import os
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from ascii_parser import parse_tables, write_tables
+from gpt_extract import extract_with_gpt
+from profiling import profile_document
+from text_store import MappedText
+import whisper_client
+
+# ---------------------------------------------------
+# Pipelined batch executor
+#
+#   submit -> wait (poll + retrieve) -> parse -> write
+#
+# result_text is streamed to output/.text/NAME.txt and parsed line by
+# line through its mmap index, so big statements are never held whole.
+#
+# Each stage has its own workers and a bounded queue in front of it, so
+# LLMWhisperer jobs for the next documents stay in flight while earlier
+# ones are parsed and written. Batch wall time tends to the slowest stage
+# instead of the sum of all stages.
+# ---------------------------------------------------
+
+_STOP = object()
+
+
+class Stage:
+    """
+    name    - label used in timings
+    func    - func(job_value) -> value for the next stage
+    workers - concurrent workers for this stage
+    maxsize - bound of the queue feeding this stage (backpressure)
+    pool    - "thread", or "process" for CPU-bound stages (func must be
+              a picklable module-level function)
+    """
+
+    def __init__(self, name, func, workers=1, maxsize=None, pool="thread"):
+        self.name = name
+        self.func = func
+        self.workers = workers
+        self.maxsize = maxsize if maxsize is not None else workers * 2
+        self.pool = pool
+
+
+class Job:
+    def __init__(self, key, value):
+        self.key = key
+        self.value = value
+        self.error = None
+        self.failed_stage = None
+        # stage name -> (queued_at, started_at, finished_at)
+        self.timings = {}
+
+
+def _run_stage(stage, q_in, q_out, executor):
+    while True:
+        job = q_in.get()
+        if job is _STOP:
+            return
+
+        if job.error is None:
+            started = time.perf_counter()
+            try:
+                if executor is not None:
+                    job.value = executor.submit(stage.func, job.value).result()
+                else:
+                    job.value = stage.func(job.value)
+            except Exception as e:
+                job.error = e
+                job.failed_stage = stage.name
+            job.timings[stage.name] = (job.enqueued_at, started, time.perf_counter())
+
+        job.enqueued_at = time.perf_counter()
+        q_out.put(job)
+
+
+def run_pipeline(items, stages, on_done=None):
+    """
+    items: iterable of (key, value). Returns the finished Job objects in
+    completion order; failures keep going through the pipeline untouched
+    with job.error set, so one bad document never stops the batch.
+    An exception raised by `items` itself is re-raised once the jobs fed
+    before it have finished.
+    """
+    queues = [queue.Queue(maxsize=s.maxsize) for s in stages]
+    done = queue.Queue()
+    queues.append(done)
+
+    executors = [
+        ProcessPoolExecutor(max_workers=s.workers) if s.pool == "process" else None
+        for s in stages
+    ]
+
+    threads = []
+    for i, stage in enumerate(stages):
+        group = [
+            threading.Thread(
+                target=_run_stage,
+                args=(stage, queues[i], queues[i + 1], executors[i]),
+                name=f"{stage.name}-{n}",
+                daemon=True,
+            )
+            for n in range(stage.workers)
+        ]
+        for t in group:
+            t.start()
+        threads.append(group)
+
+    feed_errors = []
+
+    def feed():
+        try:
+            for key, value in items:
+                job = Job(key, value)
+                job.enqueued_at = time.perf_counter()
+                queues[0].put(job)
+        except Exception as e:
+            # Re-raised by run_pipeline once the jobs already fed are done
+            feed_errors.append(e)
+        finally:
+            # Shut stages down in order once the one before has drained
+            for i, stage in enumerate(stages):
+                for _ in range(stage.workers):
+                    queues[i].put(_STOP)
+                for t in threads[i]:
+                    t.join()
+            done.put(_STOP)
+
+    feeder = threading.Thread(target=feed, name="feeder", daemon=True)
+    feeder.start()
+
+    results = []
+    try:
+        while True:
+            job = done.get()
+            if job is _STOP:
+                break
+            results.append(job)
+            if on_done is not None:
+                on_done(job)
+    finally:
+        for ex in executors:
+            if ex is not None:
+                ex.shutdown()
+
+    if feed_errors:
+        raise feed_errors[0]
+    return results
+
+
+# ---------------------------------------------------
+# Timing summary
+# ---------------------------------------------------
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    k = min(len(values) - 1, max(0, int(round(pct / 100 * (len(values) - 1)))))
+    return values[k]
+
+
+def stage_report(jobs, stages, wall_time):
+    lines = [f"{len(jobs)} documents in {wall_time:.1f}s "
+             f"({len(jobs) / wall_time if wall_time else 0:.2f} docs/s)"]
+    lines.append(f"{'stage':<8} {'n':>5} {'p50 s':>8} {'p99 s':>8} {'wait p50':>9} {'busy s':>8}")
+    for stage in stages:
+        service = [j.timings[stage.name][2] - j.timings[stage.name][1]
+                   for j in jobs if stage.name in j.timings]
+        waiting = [j.timings[stage.name][1] - j.timings[stage.name][0]
+                   for j in jobs if stage.name in j.timings]
+        lines.append(
+            f"{stage.name:<8} {len(service):>5} {percentile(service, 50):>8.2f} "
+            f"{percentile(service, 99):>8.2f} {percentile(waiting, 50):>9.2f} "
+            f"{sum(service) / stage.workers:>8.1f}"
+        )
+    failed = [j for j in jobs if j.error is not None]
+    for j in failed:
+        lines.append(f"❌ {j.key}: {j.failed_stage}: {j.error}")
+    return "\n".join(lines)
+
+
+# ---------------------------------------------------
+# LLMWhisperer document pipeline
+# ---------------------------------------------------
+
+def _doc_name(output_excel):
+    return os.path.splitext(os.path.basename(output_excel))[0]
+
+
+def parse_text(item):
+    text_path, output_excel = item
+    with profile_document(_doc_name(output_excel), "parse"), MappedText(text_path) as doc:
+        return parse_tables(doc.iter_lines()), output_excel
+
+
+def write_excel(item):
+    tables, output_excel = item
+    with profile_document(_doc_name(output_excel), "write"):
+        return write_tables(tables, output_excel)
+
+
+def document_stages(client, output_dir, in_flight=4, parse_workers=2, write_workers=2,
+                    poll_interval=5, timeout=600, parse_pool="thread",
+                    openai_client=None, model="gpt-4o", llm_workers=4):
+    """
+    Stages for dataset PDFs -> Excel. Up to `in_flight` LLMWhisperer jobs
+    are polled at once, plus whatever sits in the queue in front of them.
+    parse_pool="process" parses on a process pool for large batches.
+    With an openai_client the rule-based parse stage is replaced by the
+    GPT extraction of llmwhisperer&Gpt.py.
+    """
+    def submit(pdf_path):
+        return pdf_path, whisper_client.submit(client, pdf_path)
+
+    text_dir = os.path.join(output_dir, ".text")
+    os.makedirs(text_dir, exist_ok=True)
+
+    def wait(item):
+        pdf_path, whisper_hash = item
+        name = os.path.splitext(os.path.basename(pdf_path))[0]
+        text_path = whisper_client.wait_for_result_file(
+            client, whisper_hash, os.path.join(text_dir, f"{name}.txt"), poll_interval, timeout
+        )
+        return text_path, os.path.join(output_dir, f"{name}.xlsx")
+
+    def llm(item):
+        text_path, output_excel = item
+        with MappedText(text_path) as doc:
+            text = doc.text()
+        headers, rows = extract_with_gpt(openai_client, text, model)
+        return [("Transactions", pd.DataFrame(rows, columns=headers))], output_excel
+
+    if openai_client is None:
+        parse_stage = Stage("parse", parse_text, workers=parse_workers, pool=parse_pool)
+    else:
+        parse_stage = Stage("llm", llm, workers=llm_workers)
+
+    return [
+        Stage("submit", submit, workers=1, maxsize=in_flight),
+        Stage("wait", wait, workers=in_flight, maxsize=1),
+        parse_stage,
+        Stage("write", write_excel, workers=write_workers),
+    ]
+
+
+def process_documents(pdf_paths, output_dir, client=None, **kwargs):
+    client = client or whisper_client.make_client()
+    os.makedirs(output_dir, exist_ok=True)
+    stages = document_stages(client, output_dir, **kwargs)
+
+    def report(job):
+        if job.error is None:
+            print(f"✅ {job.key} -> {job.value}")
+        else:
+            print(f"❌ {job.key} failed in {job.failed_stage}: {job.error}")
+
+    start = time.perf_counter()
+    jobs = run_pipeline(((p, p) for p in pdf_paths), stages, on_done=report)
+    print(stage_report(jobs, stages, time.perf_counter() - start))
+    return jobs
+
+
+# ---------------------------------------------------
+# USAGE
+#   python pipeline.py dataset output
+# ---------------------------------------------------
+
+if __name__ == "__main__":
+    dataset_dir = sys.argv[1] if len(sys.argv) > 1 else "dataset"
+    output_dir = sys.argv[2] if len(sys.argv) > 2 else "output"
+
+    pdfs = sorted(
+        os.path.join(dataset_dir, f)
+        for f in os.listdir(dataset_dir)
+        if f.lower().endswith(".pdf")
+    )
+    process_documents(pdfs, output_dir)
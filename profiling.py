@@ -0,0 +1,243 @@
+import contextlib
+import functools
+import linecache
+import os
+import re
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+
+# ---------------------------------------------------
+# Opt-in profiling for the parsing / writing hot paths
+#
+#   BANK_PROFILE_DIR=profiles python pipeline.py dataset output
+#
+# or profiling.enable("profiles") from code. While enabled:
+#   - every @profiled function records calls, wall time and the peak
+#     traced memory it reached
+#   - profile_document(name) samples the calling thread's stack and
+#     takes tracemalloc snapshots, then writes profiles/<name>.profile.txt
+#     (top allocation sites, top functions, @profiled totals) and appends
+#     its collapsed stacks to profiles/batch.folded, which flamegraph.pl,
+#     speedscope or inferno read as-is.
+# tracemalloc is process-wide: run one parse/write worker when exact
+# per-document memory numbers matter.
+# Disabled, @profiled costs one attribute check per call.
+# ---------------------------------------------------
+
+SAMPLE_INTERVAL = 0.005
+TOP_N = 15
+
+
+class _State:
+    def __init__(self):
+        self.enabled = False
+        self.report_dir = None
+        self.lock = threading.Lock()
+        self.local = threading.local()
+
+
+_state = _State()
+
+
+def enable(report_dir="profiles"):
+    os.makedirs(report_dir, exist_ok=True)
+    _state.report_dir = report_dir
+    _state.enabled = True
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(1)
+
+
+def disable():
+    _state.enabled = False
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+def is_enabled():
+    return _state.enabled
+
+
+# ---------------------------------------------------
+# Function wrapper
+# ---------------------------------------------------
+
+def _peak_stack():
+    # Peak traced memory of each open @profiled call on this thread
+    peaks = getattr(_state.local, "peaks", None)
+    if peaks is None:
+        peaks = _state.local.peaks = []
+    return peaks
+
+
+def profiled(func):
+    name = f"{func.__module__}.{func.__qualname__}"
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not _state.enabled:
+            return func(*args, **kwargs)
+
+        stats = getattr(_state.local, "stats", None)
+        peaks = _peak_stack()
+        start_mem, peak = tracemalloc.get_traced_memory()
+        if peaks:
+            # reset_peak() below wipes the caller's peak so far: keep it
+            peaks[-1] = max(peaks[-1], peak)
+        peaks.append(0)
+        tracemalloc.reset_peak()
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            _, peak = tracemalloc.get_traced_memory()
+            peak = max(peaks.pop(), peak)
+            if peaks:
+                peaks[-1] = max(peaks[-1], peak)
+            if stats is not None:
+                entry = stats.setdefault(name, [0, 0.0, 0])
+                entry[0] += 1
+                entry[1] += elapsed
+                entry[2] = max(entry[2], peak - start_mem)
+
+    return wrapper
+
+
+# ---------------------------------------------------
+# Sampling CPU profiler (one thread)
+# ---------------------------------------------------
+
+def _frame_label(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    def __init__(self, thread_id, interval=SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None or self.thread_id == own:
+                continue
+            labels = []
+            while frame is not None:
+                labels.append(_frame_label(frame.f_code))
+                frame = frame.f_back
+            self.stacks[";".join(reversed(labels))] += 1
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def top_functions(self, n=TOP_N):
+        own_time = Counter()
+        total_time = Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(";")
+            own_time[frames[-1]] += count
+            for f in set(frames):
+                total_time[f] += count
+        return own_time.most_common(n), total_time.most_common(n)
+
+
+# ---------------------------------------------------
+# Per-document report
+# ---------------------------------------------------
+
+@contextlib.contextmanager
+def profile_document(name, section=""):
+    """
+    with profile_document("ICICI_1", "parse"):
+        ...
+
+    No-op unless profiling is enabled.
+    """
+    if not _state.enabled:
+        yield
+        return
+
+    _state.local.stats = {}
+    before = tracemalloc.take_snapshot()
+    start = time.perf_counter()
+    sampler = StackSampler(threading.get_ident()).start()
+    try:
+        yield
+    finally:
+        sampler.stop()
+        elapsed = time.perf_counter() - start
+        after = tracemalloc.take_snapshot()
+        stats = _state.local.stats
+        _state.local.stats = None
+        try:
+            _write_report(name, section, elapsed, before, after, sampler, stats)
+        except OSError as e:
+            # Profiling never fails the run it measures
+            print(f"⚠️  profile report for {name} not written: {e}")
+
+
+def _report_name(name):
+    # One flat file per document: "dataset/ICICI 1.pdf" -> "dataset_ICICI_1.pdf"
+    return re.sub(r"[^\w.\-]+", "_", name).strip("._") or "document"
+
+
+def _write_report(name, section, elapsed, before, after, sampler, stats):
+    name = _report_name(name)
+    filters = [
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, __file__),
+        # StackSampler's thread
+        tracemalloc.Filter(False, threading.__file__),
+    ]
+    diff = after.filter_traces(filters).compare_to(before.filter_traces(filters), "lineno")
+    own_time, total_time = sampler.top_functions()
+    n_samples = sum(sampler.stacks.values()) or 1
+
+    title = f"{name} [{section}]" if section else name
+    lines = [f"=== {title}: {elapsed:.3f}s, {n_samples} samples"]
+
+    lines.append("\n-- @profiled functions (calls, seconds, peak KiB)")
+    for fname, (calls, seconds, peak) in sorted(stats.items(), key=lambda kv: -kv[1][1]):
+        lines.append(f"{calls:>8} {seconds:>9.3f} {peak / 1024:>10.1f}  {fname}")
+
+    lines.append("\n-- top allocation sites (net KiB, count)")
+    for stat in diff[:TOP_N]:
+        frame = stat.traceback[0]
+        source = linecache.getline(frame.filename, frame.lineno).strip()
+        lines.append(
+            f"{stat.size_diff / 1024:>10.1f} {stat.count_diff:>8}  "
+            f"{os.path.basename(frame.filename)}:{frame.lineno}  {source}"
+        )
+
+    lines.append("\n-- top functions by own time (% samples)")
+    for label, count in own_time:
+        lines.append(f"{100 * count / n_samples:>6.1f}%  {label}")
+
+    lines.append("\n-- top functions by total time (% samples)")
+    for label, count in total_time:
+        lines.append(f"{100 * count / n_samples:>6.1f}%  {label}")
+
+    folded = "".join(f"{name};{stack} {count}\n" for stack, count in sampler.stacks.items())
+
+    with _state.lock:
+        path = os.path.join(_state.report_dir, f"{name}.profile.txt")
+        with open(path, "a", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n\n")
+        with open(os.path.join(_state.report_dir, "batch.folded"), "a", encoding="utf-8") as f:
+            f.write(folded)
+
+
+if os.environ.get("BANK_PROFILE_DIR"):
+    enable(os.environ["BANK_PROFILE_DIR"])
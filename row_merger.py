@@ -0,0 +1,318 @@
+import re
+import sys
+import time
+from operator import itemgetter
+
+# ---------------------------------------------------
+# Continuation-row merging
+#
+# Long narrations wrap onto extra table rows that carry text in a few
+# columns and nothing in the date / amount columns. Which columns a real
+# transaction fills differs per bank, so the rules are learned from the
+# statement itself: rows with a date and an amount are "confirmed"
+# transactions, and the columns they fill with dates or numbers are the
+# ones a continuation row leaves empty. A row with text only outside
+# those columns continues the previous transaction.
+#
+# Fragments are buffered per column and joined once in finish(), so a
+# narration that wraps k times costs O(k) instead of O(k^2).
+# ---------------------------------------------------
+
+DATE_REGEX = re.compile(r"\d{1,4}[-/. ](?:\d{1,2}|[A-Za-z]{3,9})[-/. ]\d{2,4}")
+AMOUNT_REGEX = re.compile(r"^[-+(]?\s*(?:rs\.?|inr|₹)?\s*\d[\d,]*(?:\.\d+)?\)?\s*(?:cr|dr)?$", re.IGNORECASE)
+
+MIN_CONFIRMED = 3      # below this the fixed no-date rule is used
+LEARN_ROWS = 500       # confirmed rows sampled per statement
+NUMERIC_SHARE = 0.9    # share of a column's values that are dates/amounts
+
+
+def is_date(value):
+    return bool(DATE_REGEX.search(value))
+
+
+def is_amount(value):
+    return bool(AMOUNT_REGEX.match(value.strip()))
+
+
+class RowMerger:
+    """
+    merger = RowMerger(col_map).learn(data_rows)
+    for row in data_rows:
+        if merger.is_continuation(row): merger.continue_last(row)
+        else: merger.append(row)
+    merged = merger.finish()
+
+    With fewer than MIN_CONFIRMED confirmed rows, a continuation is a row
+    without a date that has narration text, and only the narration is
+    appended (the pre-learning rule).
+
+    col_map is the map_columns() result; only "date", "debit", "credit",
+    "balance" and "desc" are looked at, and all are optional.
+    """
+
+    def __init__(self, col_map=None):
+        self.col_map = col_map or {}
+        self.amount_cols = [self.col_map[k] for k in ("debit", "credit", "balance") if k in self.col_map]
+        self.rows = []
+        # column -> fragments of the last row, joined when it is closed
+        self.fragments = {}
+        self.confirmed = 0
+        self.numeric = ()       # date / amount columns of real transactions
+        self.merge_cols = None  # columns continue_last() appends; None = all
+        self.learned = False
+        self.is_continuation = self._fallback_continuation
+
+    # -- learning --------------------------------------------------
+
+    def is_confirmed(self, row):
+        """
+        A row that is certainly a transaction: a date and an amount.
+        """
+        date_idx = self.col_map.get("date")
+        if date_idx is not None:
+            if not (date_idx < len(row) and row[date_idx] and is_date(row[date_idx])):
+                return False
+        elif not any(is_date(c) for c in row):
+            return False
+
+        if self.amount_cols:
+            return any(i < len(row) and row[i] and is_amount(row[i]) for i in self.amount_cols)
+        return any(is_amount(c) for c in row)
+
+    def learn(self, rows):
+        filled = {}
+        numeric = {}
+        confirmed = 0
+
+        for row in rows:
+            if confirmed >= LEARN_ROWS:
+                break
+            if not self.is_confirmed(row):
+                continue
+            confirmed += 1
+            for i, cell in enumerate(row):
+                cell = cell.strip()
+                if not cell:
+                    continue
+                filled[i] = filled.get(i, 0) + 1
+                if is_date(cell) or is_amount(cell):
+                    numeric[i] = numeric.get(i, 0) + 1
+
+        self.confirmed = confirmed
+        learned = {i for i, n in numeric.items() if n >= NUMERIC_SHARE * filled[i]}
+        if confirmed:
+            # Known date / amount columns count even when this statement
+            # never fills them (e.g. no credits)
+            learned.update(self.amount_cols)
+            if "date" in self.col_map:
+                learned.add(self.col_map["date"])
+        self.numeric = tuple(sorted(learned))
+
+        if confirmed >= MIN_CONFIRMED and self.numeric:
+            # Cached per statement: one C-level call fetches every numeric cell
+            self._numeric_cells = itemgetter(*self.numeric, self.numeric[0])
+            self._min_width = self.numeric[-1] + 1
+            self.learned = True
+            self.is_continuation = self._learned_continuation
+            # Continuations only carry text, so only text columns are merged
+            self.merge_cols = [i for i in range(max(max(filled), self.numeric[-1]) + 1) if i not in self.numeric]
+        else:
+            self.learned = False
+            self.is_continuation = self._fallback_continuation
+            self.merge_cols = [self.col_map["desc"]] if "desc" in self.col_map else None
+        return self
+
+    # -- classification --------------------------------------------
+
+    def _cell(self, row, key):
+        i = self.col_map.get(key)
+        return row[i].strip() if i is not None and i < len(row) else ""
+
+    def _fallback_continuation(self, row):
+        # Too little to learn from: a row without a date that has
+        # narration text continues the previous one
+        if not self.rows or self._cell(row, "date"):
+            return False
+        if "desc" in self.col_map:
+            return bool(self._cell(row, "desc"))
+        return any(cell.strip() for cell in row)
+
+    def _learned_continuation(self, row):
+        if not self.rows:
+            return False
+        if len(row) >= self._min_width:
+            if "".join(self._numeric_cells(row)).strip():
+                return False
+        elif any(i < len(row) and row[i].strip() for i in self.numeric):
+            return False
+        return bool("".join(row).strip())
+
+    # -- accumulation ----------------------------------------------
+
+    def append(self, row):
+        if self.fragments:
+            self._join()
+        self.rows.append(row)
+
+    def continue_last(self, row):
+        prev = self.rows[-1]
+        fragments = self.fragments
+        cols = self.merge_cols
+        if cols is None or (self.learned and len(row) > len(prev)):
+            # Cells past the learned width are merged too
+            cols = range(len(row)) if cols is None else [*cols, *range(len(prev), len(row))]
+        for i in cols:
+            cell = row[i] if i < len(row) else ""
+            if not cell:
+                continue
+            cell = cell.strip()
+            if i >= len(prev):
+                prev.extend([""] * (i + 1 - len(prev)))
+            parts = fragments.get(i)
+            if parts is not None:
+                parts.append(cell)
+            elif prev[i]:
+                fragments[i] = [prev[i], cell]
+            else:
+                prev[i] = cell
+
+    def _join(self):
+        prev = self.rows[-1]
+        for i, parts in self.fragments.items():
+            prev[i] = " ".join(parts)
+        self.fragments.clear()
+
+    def merge(self, rows, skip=None):
+        """
+        Classify and accumulate `rows` in one loop; returns finish().
+        skip(row, is_continuation) -> True drops the row.
+        """
+        merged = self.rows
+        fragments = self.fragments
+        learned = self.learned
+        if learned:
+            numeric_cells, min_width = self._numeric_cells, self._min_width
+        # Usual layout: one text column (the narration). Its fragments are
+        # kept in a local list instead of going through continue_last().
+        single = self.merge_cols[0] if learned and len(self.merge_cols) == 1 else None
+        parts = None
+
+        for row in rows:
+            if not merged:
+                continuation = False
+            elif learned and len(row) >= min_width:
+                cells = numeric_cells(row)
+                if any(cells) and "".join(cells).strip():
+                    continuation = False
+                elif single is not None and single < len(row) <= len(merged[-1]) and row[single].strip():
+                    # The usual wrap: narration text and nothing else
+                    if skip is not None and skip(row, True):
+                        continue
+                    if fragments:
+                        self._join()
+                    cell = row[single].strip()
+                    if parts is not None:
+                        parts.append(cell)
+                    elif merged[-1][single]:
+                        parts = [merged[-1][single], cell]
+                    else:
+                        merged[-1][single] = cell
+                    continue
+                else:
+                    continuation = bool("".join(row).strip())
+            else:
+                continuation = self.is_continuation(row)
+
+            if skip is not None and skip(row, continuation):
+                continue
+
+            if parts is not None:
+                # Leaving the fast path: the last row is closed or goes
+                # through continue_last()
+                if continuation:
+                    fragments[single] = parts
+                else:
+                    merged[-1][single] = " ".join(parts)
+                parts = None
+
+            if not continuation:
+                if fragments:
+                    self._join()
+                merged.append(row)
+            else:
+                self.continue_last(row)
+
+        if parts is not None:
+            merged[-1][single] = " ".join(parts)
+        return self.finish()
+
+    def finish(self):
+        if self.fragments:
+            self._join()
+        return self.rows
+
+
+def merge_rows(rows, col_map=None, skip=None):
+    return RowMerger(col_map).learn(rows).merge(rows, skip)
+
+
+# ---------------------------------------------------
+# Benchmark: pathological wrapping vs. in-place concatenation
+#   python row_merger.py [continuation_rows]
+# ---------------------------------------------------
+
+BENCH_COLUMNS = {"date": 0, "desc": 1, "debit": 2, "credit": 3, "balance": 4}
+
+
+def _legacy_merge(rows, col_map):
+    # The previous merge_split_rows() loop: prev[desc] += " " + desc
+    merged = []
+    prev = None
+    for row in rows:
+        date = row[col_map["date"]].strip()
+        bal = row[col_map["balance"]].strip()
+        desc = row[col_map["desc"]].strip()
+        if prev and (not date or not bal) and desc:
+            prev[col_map["desc"]] += " " + desc
+            continue
+        prev = row
+        merged.append(row)
+    return merged
+
+
+def _synthetic_rows(n_transactions, wraps):
+    for i in range(n_transactions):
+        yield [f"{i % 28 + 1:02d}-01-2024", f"UPI/{i:09d}/PAYMENT", f"{i % 997 + 1}.00", "", f"{100000 - i}.00"]
+        for j in range(wraps):
+            yield ["", f"MERCHANT REF {i:06d}-{j:06d}", "", "", ""]
+
+
+def _time(label, func, rows, repeat=3):
+    # Best of `repeat` runs on fresh copies (the merge mutates rows)
+    best = None
+    for _ in range(repeat):
+        copy = [list(r) for r in rows]
+        start = time.perf_counter()
+        merged = func(copy, BENCH_COLUMNS)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    print(f"{label:<10} {best:8.3f}s   rows {len(merged)}")
+    return best, merged
+
+
+def benchmark(wraps=100_000):
+    cases = [
+        ("typical statement", 50_000, 2),
+        ("narrations wrapped thousands of times", 5, wraps // 5),
+    ]
+    for title, n, k in cases:
+        print(f"\n{title}: {n:,} transactions x {k:,} continuation rows")
+        rows = list(_synthetic_rows(n, k))
+        t_old, old = _time("+= concat", _legacy_merge, rows)
+        t_new, new = _time("RowMerger", merge_rows, rows)
+        assert old == new
+        print(f"✅ x{t_old / t_new:.2f}")
+
+
+if __name__ == "__main__":
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
@@ -0,0 +1,349 @@
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import socket
+import threading
+import time
+
+# ---------------------------------------------------
+# Coordination-free sharded processing over a shared dataset directory
+#
+#   dataset/NAME.pdf                 input, shared read-only
+#   output/NAME.xlsx                 result, published exactly once
+#   output/.leases/NAME.lease        {"owner", "expires"} while in progress
+#   output/.leases/NAME.failed       attempt count after errors
+#
+# Any number of worker processes on any number of hosts can point at the
+# same directories. A lease is claimed by hard-linking a fully written
+# temp file into place (fails if one exists); an expired lease is taken
+# over by renaming it away, which only one worker can win. Results are
+# written to a temp file and linked into place the same way, so even if
+# two workers end up processing the same PDF only one output is kept.
+# Renewal replaces the lease in place while it still has a good part of
+# its TTL left (a takeover needs an expired lease) and re-reads it to
+# confirm; renewal stops after MAX_LEASE_LIFETIME so a hung worker's
+# document is picked up by someone else. A lost lease is not counted as
+# a failed attempt.
+# Hosts need roughly synchronised clocks (well within LEASE_TTL).
+# ---------------------------------------------------
+
+LEASE_TTL = 120
+# A lease is not renewed past this, so a hung worker frees its document
+MAX_LEASE_LIFETIME = 1800
+MAX_ATTEMPTS = 3
+
+
+def worker_id():
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+def _publish_exclusive(tmp_path, final_path):
+    """
+    Atomically move tmp_path to final_path unless final_path exists.
+    Raises FileExistsError when another worker got there first.
+    """
+    if os.name == "nt":
+        # rename refuses to overwrite on Windows
+        os.rename(tmp_path, final_path)
+        return
+    try:
+        os.link(tmp_path, final_path)
+    finally:
+        os.unlink(tmp_path)
+
+
+def _write_json(path, payload):
+    # Written aside and renamed, so a crash never leaves a truncated file
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(payload, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def _read_json(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except (json.JSONDecodeError, OSError):
+        return {}
+
+
+class LeaseLost(RuntimeError):
+    pass
+
+
+class Lease:
+    def __init__(self, lease_dir, name, owner, ttl=LEASE_TTL, max_lifetime=MAX_LEASE_LIFETIME):
+        self.path = os.path.join(lease_dir, f"{name}.lease")
+        self.name = name
+        self.owner = owner
+        self.ttl = ttl
+        self.max_lifetime = max_lifetime
+        self.acquired = None
+        self.lost = threading.Event()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _tmp(self):
+        return f"{self.path}.{self.owner}.{time.monotonic_ns()}.tmp"
+
+    def _payload(self):
+        return {"owner": self.owner, "expires": time.time() + self.ttl}
+
+    def try_acquire(self):
+        current = _read_json(self.path)
+
+        if current is not None:
+            expires = current.get("expires")
+            if expires is None:
+                # Unreadable lease: fall back to its mtime
+                try:
+                    expires = os.path.getmtime(self.path) + self.ttl
+                except FileNotFoundError:
+                    expires = 0
+            if expires > time.time():
+                return False
+            if not self._take_over_expired():
+                return False
+
+        tmp = self._tmp()
+        _write_json(tmp, self._payload())
+        try:
+            _publish_exclusive(tmp, self.path)
+        except FileExistsError:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            return False
+        self.acquired = time.monotonic()
+        return True
+
+    def _take_over_expired(self):
+        stale = f"{self.path}.stale.{self.owner}"
+        try:
+            os.rename(self.path, stale)
+        except (FileNotFoundError, FileExistsError, PermissionError):
+            return False
+
+        # The owner may have renewed between our read and the rename
+        previous = _read_json(stale) or {}
+        if previous.get("expires", 0) > time.time():
+            try:
+                _publish_exclusive(stale, self.path)
+            except FileExistsError:
+                pass
+            return False
+
+        os.unlink(stale)
+        print(f"⚠️  {self.name}: took over expired lease from {previous.get('owner', '?')}")
+        return True
+
+    def _owned(self, margin=0):
+        # Our lease, valid for at least `margin` more seconds
+        current = _read_json(self.path)
+        return (bool(current) and current.get("owner") == self.owner
+                and current.get("expires", 0) > time.time() + margin)
+
+    def is_held(self):
+        with self._lock:
+            return not self.lost.is_set() and self._owned()
+
+    def renew(self):
+        """
+        Replace the lease with a fresh one and re-read it to confirm. Only
+        done while the current lease has over a quarter of its TTL left:
+        nobody takes over a lease before it expires, so the replace cannot
+        land on another worker's lease.
+        """
+        with self._lock:
+            if self.lost.is_set():
+                return False
+            if self.max_lifetime and time.monotonic() - self.acquired > self.max_lifetime:
+                # The document is stuck; stop renewing and let the lease expire
+                print(f"⚠️  {self.name}: held for over {self.max_lifetime}s, no longer renewing")
+                self.lost.set()
+                return False
+            if not self._owned(margin=self.ttl / 4):
+                self.lost.set()
+                return False
+
+            tmp = self._tmp()
+            _write_json(tmp, self._payload())
+            os.replace(tmp, self.path)
+            if not self._owned():
+                self.lost.set()
+                return False
+            return True
+
+    def _heartbeat(self):
+        while not self._stop.wait(self.ttl / 3):
+            if not self.renew():
+                print(f"⚠️  {self.name}: lease lost")
+                return
+
+    def start_heartbeat(self):
+        self._thread = threading.Thread(target=self._heartbeat, daemon=True)
+        self._thread.start()
+
+    def release(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        with self._lock:
+            if self._owned():
+                try:
+                    os.unlink(self.path)
+                except FileNotFoundError:
+                    pass
+
+
+# ---------------------------------------------------
+# Processing functions: func(pdf_path, output_path)
+# ---------------------------------------------------
+
+def process_with_whisperer(pdf_path, output_path):
+    import whisper_client
+    from ascii_parser import parse_tables, write_tables
+    from text_store import MappedText, remove_text
+
+    client = whisper_client.make_client()
+    whisper_hash = whisper_client.submit(client, pdf_path)
+    # result_text is streamed next to the (temporary) output and parsed
+    # line by line, so large statements are never held as one string
+    text_path = whisper_client.wait_for_result_file(
+        client, whisper_hash, f"{os.path.splitext(output_path)[0]}.txt"
+    )
+    try:
+        with MappedText(text_path) as doc:
+            tables = parse_tables(doc.iter_lines())
+        write_tables(tables, output_path)
+    finally:
+        remove_text(text_path)
+
+
+def process_with_pdfplumber(pdf_path, output_path):
+    from new2 import extract_transactions_from_pdf
+
+    if extract_transactions_from_pdf(pdf_path, output_path) is None:
+        raise ValueError("no transactions found")
+
+
+ENGINES = {
+    "whisper": process_with_whisperer,
+    "pdfplumber": process_with_pdfplumber,
+}
+
+
+# ---------------------------------------------------
+# Worker loop
+# ---------------------------------------------------
+
+def _order_for(owner, names):
+    # Each worker walks the dataset in its own order to keep lease
+    # contention low without any coordination
+    return sorted(names, key=lambda n: hashlib.sha1(f"{owner}/{n}".encode()).hexdigest())
+
+
+def run_worker(dataset_dir, output_dir, func=process_with_whisperer, owner=None,
+               ttl=LEASE_TTL, max_attempts=MAX_ATTEMPTS, idle_sleep=None,
+               max_lifetime=MAX_LEASE_LIFETIME):
+    """
+    Process PDFs until every one has an output or has failed max_attempts
+    times. Returns the list of names this worker published.
+    """
+    owner = owner or worker_id()
+    lease_dir = os.path.join(output_dir, ".leases")
+    os.makedirs(lease_dir, exist_ok=True)
+    idle_sleep = idle_sleep if idle_sleep is not None else max(1, ttl / 4)
+    published = []
+
+    while True:
+        names = [os.path.splitext(f)[0] for f in os.listdir(dataset_dir)
+                 if f.lower().endswith(".pdf")]
+        pending = 0
+
+        for name in _order_for(owner, names):
+            output_path = os.path.join(output_dir, f"{name}.xlsx")
+            failed_path = os.path.join(lease_dir, f"{name}.failed")
+            if os.path.exists(output_path):
+                continue
+            attempts = (_read_json(failed_path) or {}).get("attempts", 0)
+            if attempts >= max_attempts:
+                continue
+            pending += 1
+
+            lease = Lease(lease_dir, name, owner, ttl, max_lifetime)
+            if not lease.try_acquire():
+                continue
+            if os.path.exists(output_path):
+                # Finished by the previous holder just before we claimed it
+                lease.release()
+                continue
+
+            lease.start_heartbeat()
+            tmp_output = os.path.join(output_dir, f".{name}.{owner}.tmp.xlsx")
+            try:
+                func(os.path.join(dataset_dir, f"{name}.pdf"), tmp_output)
+                if not lease.is_held():
+                    raise LeaseLost("lease lost before publishing")
+                _publish_exclusive(tmp_output, output_path)
+                published.append(name)
+                pending -= 1
+                print(f"✅ [{owner}] {name}")
+            except FileExistsError:
+                print(f"⚠️  [{owner}] {name}: already published by another worker")
+                pending -= 1
+            except LeaseLost as e:
+                # Not the document's fault: whoever holds the lease now
+                # processes it, and no attempt is counted
+                print(f"⚠️  [{owner}] {name}: {e}")
+            except Exception as e:
+                _write_json(failed_path, {"attempts": attempts + 1, "error": str(e), "owner": owner})
+                print(f"❌ [{owner}] {name}: {e}")
+            finally:
+                if os.path.exists(tmp_output):
+                    os.unlink(tmp_output)
+                lease.release()
+
+        if pending == 0:
+            return published
+        # Remaining PDFs are leased by others; wait to see them finish or expire
+        time.sleep(idle_sleep)
+
+
+def _worker_main(dataset_dir, output_dir, engine, ttl, max_lifetime):
+    run_worker(dataset_dir, output_dir, ENGINES[engine], ttl=ttl, max_lifetime=max_lifetime)
+
+
+# ---------------------------------------------------
+# USAGE (start the same command on every host)
+#   python shard_worker.py --dataset dataset --output output --workers 4
+# ---------------------------------------------------
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Lease-based sharded statement processing")
+    parser.add_argument("--dataset", default="dataset")
+    parser.add_argument("--output", default="output")
+    parser.add_argument("--workers", type=int, default=1, help="local worker processes")
+    parser.add_argument("--engine", choices=sorted(ENGINES), default="whisper")
+    parser.add_argument("--ttl", type=float, default=LEASE_TTL, help="lease lifetime in seconds")
+    parser.add_argument("--max-lease", type=float, default=MAX_LEASE_LIFETIME,
+                        help="seconds a document may hold its lease, 0 = no limit")
+    args = parser.parse_args()
+
+    os.makedirs(args.output, exist_ok=True)
+    procs = [
+        multiprocessing.Process(target=_worker_main,
+                                args=(args.dataset, args.output, args.engine, args.ttl, args.max_lease))
+        for _ in range(args.workers)
+    ]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join()
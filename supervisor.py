@@ -0,0 +1,276 @@
+import argparse
+import json
+import multiprocessing
+import os
+import time
+from collections import deque
+from multiprocessing.connection import wait
+
+from shard_worker import ENGINES
+
+# ---------------------------------------------------
+# Process-isolated document pool
+#
+#   python supervisor.py dataset output --engine pdfplumber \
+#       --workers 4 --timeout 300 --max-rss-mb 2048 --max-tasks 20
+#
+# Every document runs in a pooled worker process. The supervisor
+#   - kills a worker whose document exceeds the wall-clock timeout
+#     (hung pdfplumber page, whisper_status loop that never ends)
+#   - kills a worker whose RSS grows past the limit
+#   - notices workers that crash (segfault, OOM killer, os._exit)
+#   - retires a worker after max_tasks documents so slow leaks are capped
+# and replaces the worker each time. The document is retried up to
+# max_attempts times, then recorded as failed; the batch carries on.
+# Output is written to a temp file and renamed into place on success.
+# ---------------------------------------------------
+
+TIMEOUT = 300
+MAX_RSS_MB = 2048
+MAX_TASKS = 20
+MAX_ATTEMPTS = 2
+TICK = 0.5
+
+
+def rss_bytes(pid):
+    """
+    Resident set size of `pid`, or None when it cannot be read. Uses
+    /proc on Linux and psutil (optional) elsewhere.
+    """
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import psutil
+        return psutil.Process(pid).memory_info().rss
+    except Exception:
+        return None
+
+
+def _worker_loop(conn, func, max_tasks):
+    """
+    Child process: run tasks from `conn` until None, EOF, or max_tasks.
+    """
+    done = 0
+    while not max_tasks or done < max_tasks:
+        try:
+            task = conn.recv()
+        except EOFError:
+            return
+        if task is None:
+            return
+        name, pdf_path, output_path = task
+        start = time.perf_counter()
+        try:
+            func(pdf_path, output_path)
+            error = None
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        conn.send((name, error, time.perf_counter() - start))
+        done += 1
+
+
+class Worker:
+    def __init__(self, ctx, func, max_tasks):
+        self.conn, child = ctx.Pipe()
+        self.process = ctx.Process(target=_worker_loop, args=(child, func, max_tasks), daemon=True)
+        self.process.start()
+        child.close()
+        self.max_tasks = max_tasks
+        self.done = 0
+        self.task = None
+        self.started = None
+        self.deadline = None
+
+    @property
+    def busy(self):
+        return self.task is not None
+
+    @property
+    def retired(self):
+        return bool(self.max_tasks) and self.done >= self.max_tasks
+
+    def assign(self, task, timeout):
+        self.task = task
+        self.started = time.monotonic()
+        self.deadline = self.started + timeout
+        self.conn.send(task)
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+        self.process.join(5)
+        if self.process.is_alive():
+            self.kill()
+        self.conn.close()
+
+    def kill(self):
+        self.process.terminate()
+        self.process.join(2)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+
+
+class Supervisor:
+    def __init__(self, func, output_dir, workers=2, timeout=TIMEOUT, max_rss_mb=MAX_RSS_MB,
+                 max_tasks=MAX_TASKS, max_attempts=MAX_ATTEMPTS, start_method=None):
+        self.func = func
+        self.output_dir = output_dir
+        self.workers = workers
+        self.timeout = timeout
+        self.max_rss = max_rss_mb * 1024 * 1024 if max_rss_mb else None
+        self.max_tasks = max_tasks
+        self.max_attempts = max_attempts
+        self.ctx = multiprocessing.get_context(start_method)
+        # name -> {"status", "error", "attempts", "seconds"}
+        self.results = {}
+        self.restarts = 0
+
+    def _spawn(self):
+        return Worker(self.ctx, self.func, self.max_tasks)
+
+    def _tmp_output(self, name):
+        return os.path.join(self.output_dir, f".{name}.tmp.xlsx")
+
+    def _finish(self, name, error, seconds, pending):
+        entry = self.results.setdefault(name, {"attempts": 0})
+        entry["attempts"] += 1
+        entry["seconds"] = round(seconds, 3)
+        tmp = self._tmp_output(name)
+
+        if error is None and os.path.exists(tmp):
+            os.replace(tmp, os.path.join(self.output_dir, f"{name}.xlsx"))
+            entry.update(status="ok", error=None)
+            print(f"✅ {name} ({seconds:.1f}s)")
+            return
+
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        error = error or "no output written"
+        entry.update(status="failed", error=error)
+        if entry["attempts"] < self.max_attempts:
+            print(f"⚠️  {name}: {error}, retrying")
+            pending.append((name, entry["pdf_path"]))
+        else:
+            print(f"❌ {name}: {error}")
+
+    def _replace(self, pool, i, kill=False):
+        if kill:
+            pool[i].kill()
+            pool[i].conn.close()
+            self.restarts += 1
+        else:
+            pool[i].stop()
+        pool[i] = self._spawn()
+
+    def run(self, pdf_paths):
+        os.makedirs(self.output_dir, exist_ok=True)
+        pending = deque()
+        for pdf_path in pdf_paths:
+            name = os.path.splitext(os.path.basename(pdf_path))[0]
+            self.results[name] = {"attempts": 0, "pdf_path": pdf_path}
+            pending.append((name, pdf_path))
+
+        pool = [self._spawn() for _ in range(self.workers)]
+        try:
+            while pending or any(w.busy for w in pool):
+                for w in pool:
+                    if not w.busy and pending:
+                        name, pdf_path = pending.popleft()
+                        w.assign((name, pdf_path, self._tmp_output(name)), self.timeout)
+
+                busy = [w for w in pool if w.busy]
+                wait([w.conn for w in busy] + [w.process.sentinel for w in busy], TICK)
+
+                for i, w in enumerate(pool):
+                    if not w.busy:
+                        continue
+                    name = w.task[0]
+                    elapsed = time.monotonic() - w.started
+
+                    if w.conn.poll():
+                        try:
+                            _, error, seconds = w.conn.recv()
+                        except EOFError:
+                            # Died mid-task; handled as a crash below
+                            pass
+                        else:
+                            w.task = None
+                            w.done += 1
+                            self._finish(name, error, seconds, pending)
+                            if w.retired:
+                                self._replace(pool, i)
+                            continue
+
+                    if not w.process.is_alive():
+                        w.task = None
+                        self._finish(name, f"worker crashed (exit code {w.process.exitcode})", elapsed, pending)
+                        self._replace(pool, i, kill=True)
+                    elif time.monotonic() > w.deadline:
+                        w.task = None
+                        self._finish(name, f"timed out after {self.timeout}s", elapsed, pending)
+                        self._replace(pool, i, kill=True)
+                    elif self.max_rss:
+                        rss = rss_bytes(w.process.pid)
+                        if rss is not None and rss > self.max_rss:
+                            w.task = None
+                            self._finish(name, f"RSS {rss / 2**20:.0f} MiB over limit", elapsed, pending)
+                            self._replace(pool, i, kill=True)
+        finally:
+            for w in pool:
+                w.stop()
+
+        for entry in self.results.values():
+            entry.pop("pdf_path", None)
+        return self.results
+
+
+def write_report(results, output_dir):
+    failed = {name: r for name, r in results.items() if r["status"] != "ok"}
+    path = os.path.join(output_dir, "failed.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(failed, f, indent=2)
+    return failed
+
+
+# ---------------------------------------------------
+# USAGE
+#   python supervisor.py dataset output [--engine whisper|pdfplumber]
+# ---------------------------------------------------
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Process-isolated statement processing")
+    parser.add_argument("dataset")
+    parser.add_argument("output")
+    parser.add_argument("--engine", choices=sorted(ENGINES), default="pdfplumber")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--timeout", type=float, default=TIMEOUT, help="seconds per document")
+    parser.add_argument("--max-rss-mb", type=int, default=MAX_RSS_MB, help="0 disables the limit")
+    parser.add_argument("--max-tasks", type=int, default=MAX_TASKS, help="documents per worker, 0 = unlimited")
+    parser.add_argument("--max-attempts", type=int, default=MAX_ATTEMPTS)
+    args = parser.parse_args()
+
+    pdfs = sorted(
+        os.path.join(args.dataset, f)
+        for f in os.listdir(args.dataset)
+        if f.lower().endswith(".pdf")
+    )
+    supervisor = Supervisor(
+        ENGINES[args.engine], args.output,
+        workers=args.workers,
+        timeout=args.timeout,
+        max_rss_mb=args.max_rss_mb,
+        max_tasks=args.max_tasks,
+        max_attempts=args.max_attempts,
+    )
+    start = time.perf_counter()
+    results = supervisor.run(pdfs)
+    failed = write_report(results, args.output)
+    print(f"\n{len(results) - len(failed)}/{len(results)} documents in "
+          f"{time.perf_counter() - start:.1f}s, {len(failed)} failed, "
+          f"{supervisor.restarts} worker restarts")
@@ -2,6 +2,11 @@ import re
 import pandas as pd
 import time
 import os
+
+from ascii_parser import iter_lines
+from row_merger import RowMerger
+from text_store import MappedText, retrieve_to_file
+
 # -----------------------------
 # CONFIG
 # -----------------------------
@@ -34,13 +39,12 @@ while True:
         whisper_hash=result["whisper_hash"]
     )
     if status["status"] == "processed":
-        resultx = whisper_client.whisper_retrieve(
-            whisper_hash=result["whisper_hash"]
-        )
         break
     time.sleep(5)
 
-extracted_text = resultx["extraction"]["result_text"]
+# result_text is streamed to disk and parsed line by line (text_store.py)
+TEXT_PATH = os.path.splitext(OUTPUT_EXCEL)[0] + ".txt"
+retrieve_to_file(whisper_client, result["whisper_hash"], TEXT_PATH)
 print("Text extraction completed.")
 
 
@@ -58,7 +62,7 @@ DATE_REGEX = re.compile(r"\d{2}[-/]\d{2}[-/]\d{2,4}")
 # -----------------------------
 def parse_ascii_table(text):
     rows = []
-    for line in text.splitlines():
+    for line in iter_lines(text):
         line = line.rstrip()
         if not line.startswith("|"):
             continue
@@ -93,12 +97,12 @@ def is_removal_row(row):
 # STEP 4: Merge continuation rows
 # -----------------------------
 def merge_continuation_rows(rows, headers):
-    merged = []
-    prev = None
-
     date_idx = next(i for i, h in enumerate(headers) if "date" in h.lower())
     balance_idx = next(i for i, h in enumerate(headers) if "balance" in h.lower())
 
+    # Narration fragments are buffered and joined once (row_merger.py)
+    merger = RowMerger()
+
     for row in rows:
         # Skip TOTAL / SUMMARY rows completely
         if is_removal_row(row):
@@ -108,23 +112,17 @@ def merge_continuation_rows(rows, headers):
         balance_val = row[balance_idx].strip() if balance_idx < len(row) else ""
 
         is_continuation = (
-            prev is not None
+            merger.rows
             and not date_val
             and not balance_val
         )
 
         if is_continuation:
-            # Append narration ONLY
-            for i in range(len(row)):
-                if row[i] and not prev[i]:
-                    prev[i] = row[i]
-                elif row[i] and i != date_idx and i != balance_idx:
-                    prev[i] += " " + row[i]
+            merger.continue_last(row)
         else:
-            merged.append(row)
-            prev = row
+            merger.append(row)
 
-    return merged
+    return merger.finish()
 
 
 # -----------------------------
@@ -164,8 +162,9 @@ def extract_transactions_to_excel(extracted_text, output_file):
     print(f"✅ Saved clean transactions to {output_file}")
     return df
 
-df = extract_transactions_to_excel(
-    extracted_text,
-    "clean_bank_transactions.xlsx"
-)
+with MappedText(TEXT_PATH) as doc:
+    df = extract_transactions_to_excel(
+        doc.iter_lines(),
+        "clean_bank_transactions.xlsx"
+    )
 print(df.head())
@@ -0,0 +1,334 @@
+import codecs
+import json
+import mmap
+import os
+import re
+from array import array
+
+import requests
+from unstract.llmwhisperer.client_v2 import LLMWhispererClientException
+
+# ---------------------------------------------------
+# Streaming result_text retrieval + memory-mapped line access
+#
+# whisper_retrieve() loads the whole JSON response and the scripts then
+# hold result_text and its splitlines() copy at the same time. Here the
+# response is streamed, only the "result_text" string is decoded, and
+# it goes straight to a UTF-8 file. A sidecar index of line and page
+# offsets lets parsers iterate lines, or re-read one page or region,
+# through mmap without loading the document.
+#
+#   NAME.txt         result_text
+#   NAME.txt.idx     uint64 byte offset of every line start (+ file size)
+#   NAME.txt.pages   JSON list of the first line of every page
+# ---------------------------------------------------
+
+CHUNK_SIZE = 1 << 16
+PAGE_SEPARATOR = b"<<<"
+
+_SPECIAL = re.compile(r'["\\]')
+_ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+
+class ResultTextDecoder:
+    """
+    Incremental decoder for the top-level "result_text" string of a JSON
+    document fed in arbitrary text chunks. feed() returns the decoded
+    pieces of that value available so far; every other key and value is
+    skipped without being kept.
+    """
+
+    def __init__(self, key="result_text"):
+        self.key = key
+        self.depth = 0
+        self.state = "out"      # out | string | colon | value_start | value | done
+        self.capture = False    # decoding the wanted value
+        self.key_buf = []
+        self.pending = ""       # escape sequence split across chunks
+        self.high_surrogate = None
+
+    @property
+    def done(self):
+        return self.state == "done"
+
+    def feed(self, chunk):
+        out = []
+        text = self.pending + chunk
+        self.pending = ""
+        i = 0
+        n = len(text)
+
+        while i < n and self.state != "done":
+            if self.state in ("string", "value"):
+                m = _SPECIAL.search(text, i)
+                end = m.start() if m else n
+                if self.capture:
+                    out.append(text[i:end])
+                elif self.key_buf is not None:
+                    # Only strings short enough to be our key are kept
+                    self.key_buf.append(text[i:end])
+                    if sum(map(len, self.key_buf)) > len(self.key):
+                        self.key_buf = None
+                i = end
+                if m is None:
+                    break
+                if text[i] == '"':
+                    i += 1
+                    self._end_string()
+                    continue
+                # backslash escape
+                if i + 1 >= n:
+                    self.pending = text[i:]
+                    break
+                esc = text[i + 1]
+                if esc == "u":
+                    if i + 6 > n:
+                        self.pending = text[i:]
+                        break
+                    if self.capture:
+                        out.append(self._unicode(int(text[i + 2:i + 6], 16)))
+                    i += 6
+                else:
+                    if self.capture:
+                        out.append(_ESCAPES.get(esc, esc))
+                    i += 2
+                if not self.capture:
+                    self.key_buf = None
+                continue
+
+            c = text[i]
+            i += 1
+            if c in " \t\r\n":
+                continue
+            if self.state == "colon":
+                self.state = "value_start" if c == ":" else "out"
+                if self.state == "out":
+                    i -= 1
+                continue
+            if self.state == "value_start":
+                if c == '"':
+                    self.state = "value"
+                    self.capture = True
+                    continue
+                self.state = "out"
+            if c in "{[":
+                self.depth += 1
+            elif c in "}]":
+                self.depth -= 1
+            elif c == '"':
+                self.state = "string"
+                self.key_buf = []
+
+        return "".join(out)
+
+    def _unicode(self, code):
+        if 0xD800 <= code < 0xDC00:
+            self.high_surrogate = code
+            return ""
+        if 0xDC00 <= code < 0xE000 and self.high_surrogate is not None:
+            code = 0x10000 + ((self.high_surrogate - 0xD800) << 10) + (code - 0xDC00)
+        self.high_surrogate = None
+        return chr(code)
+
+    def _end_string(self):
+        if self.capture:
+            self.capture = False
+            self.state = "done"
+            return
+        key = "".join(self.key_buf) if self.key_buf is not None else None
+        # A key at the top level is followed by ':'
+        if self.depth == 1 and key == self.key:
+            self.state = "colon"
+        else:
+            self.state = "out"
+
+
+def retrieve_to_file(client, whisper_hash, path, chunk_size=CHUNK_SIZE):
+    """
+    Stream whisper-retrieve for `whisper_hash` into `path` and build its
+    line index. Uses the client's base_url and auth headers.
+    """
+    url = f"{client.base_url}/whisper-retrieve"
+    with requests.get(url, headers=client.headers, params={"whisper_hash": whisper_hash},
+                      stream=True, timeout=getattr(client, "api_timeout", 120)) as response:
+        if response.status_code != 200:
+            try:
+                err = response.json()
+            except ValueError:
+                err = {"message": response.text}
+            err["status_code"] = response.status_code
+            raise LLMWhispererClientException(err)
+
+        utf8 = codecs.getincrementaldecoder("utf-8")()
+        decoder = ResultTextDecoder()
+        tmp = f"{path}.part"
+        with open(tmp, "w", encoding="utf-8", newline="") as f:
+            for raw in response.iter_content(chunk_size):
+                piece = decoder.feed(utf8.decode(raw))
+                if piece:
+                    f.write(piece)
+                if decoder.done:
+                    break
+        if not decoder.done:
+            os.unlink(tmp)
+            raise LLMWhispererClientException(
+                {"status_code": -1, "message": "result_text missing from whisper-retrieve response"}
+            )
+        os.replace(tmp, path)
+
+    build_index(path)
+    return path
+
+
+# ---------------------------------------------------
+# Line / page index
+# ---------------------------------------------------
+
+def _is_page_break(line):
+    return b"\f" in line or line.strip() == PAGE_SEPARATOR
+
+
+def split_pages(text):
+    """
+    result_text -> one string per page, each ending with its page break
+    line, so "".join(pages) == text.
+    """
+    pages = []
+    current = []
+    # Lines end at "\n" only, as in build_index (splitlines() would also
+    # break at the "\f" of a page break)
+    lines = text.split("\n")
+    for i, line in enumerate(lines):
+        if i < len(lines) - 1:
+            line += "\n"
+        elif not line:
+            break
+        current.append(line)
+        if _is_page_break(line.rstrip("\r\n").encode("utf-8")):
+            pages.append("".join(current))
+            current = []
+    if current and "".join(current).strip():
+        pages.append("".join(current))
+    elif current and pages:
+        pages[-1] += "".join(current)
+    return pages
+
+
+def build_index(path):
+    offsets = array("Q", [0])
+    pages = [0]
+    size = os.path.getsize(path)
+
+    if size:
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            pos = 0
+            while True:
+                nl = mm.find(b"\n", pos)
+                end = size if nl < 0 else nl
+                if _is_page_break(mm[pos:end]):
+                    pages.append(len(offsets))
+                if nl < 0:
+                    break
+                pos = nl + 1
+                if pos >= size:
+                    break
+                offsets.append(pos)
+
+            # A break on the last line (or before trailing blank lines)
+            # starts no page: that text belongs to the last page, as in
+            # split_pages()
+            if len(pages) > 1 and (
+                pages[-1] >= len(offsets) or not mm[offsets[pages[-1]]:size].strip()
+            ):
+                pages.pop()
+    offsets.append(size)
+
+    with open(f"{path}.idx", "wb") as f:
+        offsets.tofile(f)
+    with open(f"{path}.pages", "w", encoding="utf-8") as f:
+        json.dump(pages, f)
+
+
+def remove_text(path):
+    """
+    Delete a result_text file and its index files.
+    """
+    for p in (path, f"{path}.idx", f"{path}.pages"):
+        try:
+            os.unlink(p)
+        except FileNotFoundError:
+            pass
+
+
+class MappedText:
+    """
+    Read-only, memory-mapped view of a result_text file.
+
+        doc = MappedText("output/.text/ICICI_1.txt")
+        parse_tables(doc.iter_lines())
+        doc.page_text(2)           # one page, e.g. for the LLM
+    """
+
+    def __init__(self, path):
+        self.path = path
+        if not os.path.exists(f"{path}.idx") or not os.path.exists(f"{path}.pages"):
+            build_index(path)
+
+        self.offsets = array("Q")
+        with open(f"{path}.idx", "rb") as f:
+            self.offsets.frombytes(f.read())
+        with open(f"{path}.pages", encoding="utf-8") as f:
+            self.pages = json.load(f)
+
+        self._file = open(path, "rb")
+        size = os.path.getsize(path)
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if isinstance(self._mm, mmap.mmap):
+            self._mm.close()
+        self._file.close()
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    @property
+    def page_count(self):
+        return len(self.pages)
+
+    def line(self, i):
+        start, end = self.offsets[i], self.offsets[i + 1]
+        return self._mm[start:end].decode("utf-8").rstrip("\r\n")
+
+    def iter_lines(self, start=0, stop=None):
+        stop = len(self) if stop is None else min(stop, len(self))
+        mm = self._mm
+        offsets = self.offsets
+        for i in range(start, stop):
+            yield mm[offsets[i]:offsets[i + 1]].decode("utf-8").rstrip("\r\n")
+
+    def page_range(self, page):
+        start = self.pages[page]
+        stop = self.pages[page + 1] if page + 1 < len(self.pages) else len(self)
+        return start, stop
+
+    def page_lines(self, page):
+        return self.iter_lines(*self.page_range(page))
+
+    def region_text(self, start, stop):
+        stop = min(stop, len(self))
+        if start >= stop:
+            return ""
+        return self._mm[self.offsets[start]:self.offsets[stop]].decode("utf-8")
+
+    def page_text(self, page):
+        return self.region_text(*self.page_range(page))
+
+    def text(self):
+        return self.region_text(0, len(self))
@@ -0,0 +1,250 @@
+import hashlib
+import re
+import sqlite3
+import sys
+from datetime import datetime
+
+import pandas as pd
+
+from ascii_parser import normalize_account_number
+
+
+# ---------------------------------------------------
+# Normalisation used for the duplicate hash
+# ---------------------------------------------------
+
+DATE_FORMATS = [
+    "%d-%m-%Y", "%d/%m/%Y", "%d-%m-%y", "%d/%m/%y", "%d.%m.%Y",
+    "%d-%b-%Y", "%d %b %Y", "%d-%b-%y", "%d %b %y", "%Y-%m-%d",
+]
+
+DATE_REGEX = re.compile(r"\d{1,2}[-/. ](?:\d{1,2}|[A-Za-z]{3})[-/. ]\d{2,4}|\d{4}-\d{2}-\d{2}")
+AMOUNT_REGEX = re.compile(r"-?\d[\d,]*(?:\.\d+)?")
+
+
+def normalize_date(value):
+    """
+    Returns YYYY-MM-DD so range queries can compare dates as text.
+    Unparseable values are returned stripped, unchanged.
+    """
+    value = str(value or "").strip()
+    match = DATE_REGEX.search(value)
+    if match:
+        token = match.group()
+        for fmt in DATE_FORMATS:
+            try:
+                return datetime.strptime(token, fmt).strftime("%Y-%m-%d")
+            except ValueError:
+                continue
+    return value
+
+
+def parse_amount(value):
+    """
+    "1,23,456.78 Cr" -> 123456.78, "500.00 Dr" -> -500.0, "" -> None
+    """
+    text = str(value or "").strip()
+    match = AMOUNT_REGEX.search(text)
+    if not match:
+        return None
+    amount = float(match.group().replace(",", ""))
+    if re.search(r"\bDR\b", text.upper()):
+        amount = -abs(amount)
+    return amount
+
+
+def normalize_narration(value):
+    return " ".join(str(value or "").split()).upper()
+
+
+def transaction_hash(account, date, amount, balance, narration):
+    """
+    Duplicate key of one transaction. `account` is already normalised by
+    ascii_parser.normalize_account_number (no spaces or "-", upper case),
+    so "1234-5678" and "12345678" share their keys.
+    """
+    key = "\x1f".join([
+        account,
+        date,
+        "" if amount is None else f"{amount:.2f}",
+        "" if balance is None else f"{balance:.2f}",
+        narration,
+    ])
+    return hashlib.sha1(key.encode("utf-8")).digest()
+
+
+# ---------------------------------------------------
+# Column detection (same keywords as map_columns)
+# ---------------------------------------------------
+
+def map_store_columns(headers):
+    col_map = {}
+
+    for i, h in enumerate(headers):
+        hl = str(h).lower()
+        if "date" in hl and "value" not in hl and "date" not in col_map:
+            col_map["date"] = i
+        elif any(k in hl for k in ["narration", "description", "details", "particular"]):
+            col_map.setdefault("desc", i)
+        elif "debit" in hl or "withdraw" in hl:
+            col_map.setdefault("debit", i)
+        elif "credit" in hl or "deposit" in hl:
+            col_map.setdefault("credit", i)
+        elif "balance" in hl:
+            col_map.setdefault("balance", i)
+        elif "amount" in hl:
+            col_map.setdefault("amount", i)
+
+    if "date" not in col_map:
+        raise ValueError(f"No date column in headers: {headers}")
+    return col_map
+
+
+def _signed_amount(row, col_map):
+    debit = parse_amount(row[col_map["debit"]]) if "debit" in col_map else None
+    credit = parse_amount(row[col_map["credit"]]) if "credit" in col_map else None
+    if debit:
+        return -abs(debit)
+    if credit:
+        return abs(credit)
+    if "amount" in col_map:
+        return parse_amount(row[col_map["amount"]])
+    return debit if debit is not None else credit
+
+
+# ---------------------------------------------------
+# SQLite-backed store
+# ---------------------------------------------------
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS transactions (
+    row_hash  BLOB PRIMARY KEY,
+    account   TEXT NOT NULL,
+    txn_date  TEXT NOT NULL,
+    amount    REAL,
+    balance   REAL,
+    narration TEXT NOT NULL,
+    source    TEXT,
+    raw       TEXT
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_transactions_account_date
+    ON transactions (account, txn_date);
+"""
+
+
+class TransactionStore:
+    """
+    Local transaction store shared by every statement we process.
+
+    Rows are keyed by a hash of the normalised (account, date, amount,
+    balance, narration) - see transaction_hash() - so the same transaction coming from an
+    overlapping statement or a reprocessed file is rejected on insert.
+    """
+
+    def __init__(self, path="transactions.db"):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.conn.close()
+
+    def add_rows(self, headers, rows, account, source=None):
+        """
+        Bulk insert parsed rows (lists in header order).
+        Returns (inserted, duplicates).
+        """
+        col_map = map_store_columns(headers)
+        account = normalize_account_number(account)
+        desc_idx = col_map.get("desc")
+        bal_idx = col_map.get("balance")
+
+        records = []
+        for row in rows:
+            row = [("" if c is None else str(c)) for c in row]
+            row += [""] * (len(headers) - len(row))
+
+            date = normalize_date(row[col_map["date"]])
+            amount = _signed_amount(row, col_map)
+            balance = parse_amount(row[bal_idx]) if bal_idx is not None else None
+            narration = normalize_narration(row[desc_idx]) if desc_idx is not None else ""
+
+            records.append((
+                transaction_hash(account, date, amount, balance, narration),
+                account, date, amount, balance, narration, source,
+                "\x1f".join(row),
+            ))
+
+        with self.conn:
+            before = self.conn.total_changes
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO transactions VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                records,
+            )
+            inserted = self.conn.total_changes - before
+
+        return inserted, len(records) - inserted
+
+    def add_dataframe(self, df, account, source=None):
+        df = df.fillna("")
+        return self.add_rows(
+            list(df.columns), df.astype(str).values.tolist(), account, source
+        )
+
+    def query(self, account, start=None, end=None):
+        """
+        Transactions for one account, optionally limited to
+        start <= date <= end (any format normalize_date understands).
+        """
+        sql = ("SELECT txn_date, narration, amount, balance, source "
+               "FROM transactions WHERE account = ?")
+        params = [normalize_account_number(account)]
+        if start:
+            sql += " AND txn_date >= ?"
+            params.append(normalize_date(start))
+        if end:
+            sql += " AND txn_date <= ?"
+            params.append(normalize_date(end))
+        sql += " ORDER BY txn_date"
+
+        return pd.read_sql_query(sql, self.conn, params=params)
+
+    def accounts(self):
+        cur = self.conn.execute(
+            "SELECT account, COUNT(*), MIN(txn_date), MAX(txn_date) "
+            "FROM transactions GROUP BY account ORDER BY account"
+        )
+        return cur.fetchall()
+
+
+# ---------------------------------------------------
+# USAGE
+#   python transaction_store.py add <file.xlsx> <account>
+#   python transaction_store.py query <account> [from] [to]
+# ---------------------------------------------------
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "accounts"
+
+    with TransactionStore() as store:
+        if command == "add":
+            excel_file, account = sys.argv[2], sys.argv[3]
+            df = pd.read_excel(excel_file, dtype=str)
+            inserted, dupes = store.add_dataframe(df, account, source=excel_file)
+            print(f"✅ {inserted} new transactions, {dupes} duplicates skipped")
+        elif command == "query":
+            account = sys.argv[2]
+            start = sys.argv[3] if len(sys.argv) > 3 else None
+            end = sys.argv[4] if len(sys.argv) > 4 else None
+            print(store.query(account, start, end).to_string(index=False))
+        else:
+            for account, count, first, last in store.accounts():
+                print(f"{account}: {count} transactions ({first} to {last})")
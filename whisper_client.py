@@ -0,0 +1,89 @@
+import os
+import time
+
+import text_store
+
+from unstract.llmwhisperer import LLMWhispererClientV2
+from unstract.llmwhisperer.client_v2 import LLMWhispererClientException
+
+# ==============================
+# CONFIG
+# ==============================
+BASE_URL = "https://llmwhisperer-api.us-central.unstract.com/api/v2"
+API_KEY_ENV = "LLMWhisperer_API_Key_Ath"
+MODE = "table"
+OUTPUT_MODE = "layout_preserving"
+
+
+def make_client(api_key=None, base_url=None, logging_level=""):
+    return LLMWhispererClientV2(
+        base_url=base_url or BASE_URL,
+        api_key=api_key or os.environ.get(API_KEY_ENV),
+        logging_level=logging_level,
+    )
+
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+RETRY_BACKOFF = 1.0
+
+
+def with_retry(call, retries=5, backoff=None):
+    """
+    Retry rate-limited (429) and transient 5xx responses with exponential
+    backoff; anything else is raised straight away.
+    """
+    for attempt in range(retries + 1):
+        try:
+            return call()
+        except LLMWhispererClientException as e:
+            status_code = e.value.get("status_code") if isinstance(e.value, dict) else None
+            if status_code not in RETRY_STATUS or attempt == retries:
+                raise
+            time.sleep((backoff or RETRY_BACKOFF) * 2 ** attempt)
+
+
+def submit(client, pdf_path, pages_to_extract="", mode=MODE, output_mode=OUTPUT_MODE):
+    """
+    Upload one PDF; returns the whisper_hash without waiting.
+    pages_to_extract is LLMWhisperer's page list, e.g. "1-3,7".
+    """
+    result = with_retry(lambda: client.whisper(
+        file_path=pdf_path,
+        mode=mode,
+        output_mode=output_mode,
+        pages_to_extract=pages_to_extract
+    ))
+    return result["whisper_hash"]
+
+
+def wait_for_result(client, whisper_hash, poll_interval=5, timeout=600):
+    """
+    Same polling loop as the scripts, but bounded by a timeout so one stuck
+    job cannot stall a batch.
+    """
+    wait_until_processed(client, whisper_hash, poll_interval, timeout)
+    resultx = with_retry(lambda: client.whisper_retrieve(whisper_hash=whisper_hash))
+    return resultx["extraction"]["result_text"]
+
+
+def wait_for_result_file(client, whisper_hash, path, poll_interval=5, timeout=600):
+    """
+    wait_for_result() for large documents: result_text is streamed to
+    `path` (plus its line index) instead of being returned.
+    """
+    wait_until_processed(client, whisper_hash, poll_interval, timeout)
+    return with_retry(lambda: text_store.retrieve_to_file(client, whisper_hash, path))
+
+
+def wait_until_processed(client, whisper_hash, poll_interval=5, timeout=600):
+    deadline = time.monotonic() + timeout
+
+    while True:
+        status = with_retry(lambda: client.whisper_status(whisper_hash=whisper_hash))
+        if status["status"] == "processed":
+            return status
+        if status["status"] in ("error", "failed"):
+            raise LLMWhispererClientException(status)
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"LLMWhisperer job {whisper_hash} not processed after {timeout}s")
+        time.sleep(poll_interval)
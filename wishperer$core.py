@@ -2,9 +2,9 @@ import re
 import pandas as pd
 import time
 import os
-# ---------------------------------------------------
-# 1. Parse ASCII table into raw rows
-# ---------------------------------------------------
+
+from ascii_parser import parse_tables, write_tables
+from text_store import MappedText, retrieve_to_file
 
 from unstract.llmwhisperer import LLMWhispererClientV2
 from unstract.llmwhisperer.client_v2 import LLMWhispererClientException
@@ -35,172 +35,38 @@ while True:
         whisper_hash=result["whisper_hash"]
     )
     if status["status"] == "processed":
-        resultx = whisper_client.whisper_retrieve(
-            whisper_hash=result["whisper_hash"]
-        )
         break
     time.sleep(5)
 
-extracted_text = resultx["extraction"]["result_text"]
+# result_text is streamed to disk and parsed line by line (text_store.py)
+TEXT_PATH = os.path.splitext(OUTPUT_EXCEL)[0] + ".txt"
+retrieve_to_file(whisper_client, result["whisper_hash"], TEXT_PATH)
 print("Text extraction completed.")
 
 
 
 
-def parse_ascii_table(text):
-    rows = []
-
-    for line in text.splitlines():
-        line = line.rstrip()
-
-        # Skip borders
-        if not line.startswith("|"):
-            continue
-        if set(line.replace("|", "").strip()) in [{"-"}, {"="}, set()]:
-            continue
-
-        cols = [c.strip() for c in line.split("|")[1:-1]]
-        rows.append(cols)
-
-    return rows
-
-
-# ---------------------------------------------------
-# 2. Identify header row dynamically
-# ---------------------------------------------------
-
-def detect_header(rows):
-    for i, row in enumerate(rows):
-        joined = " ".join(row).lower()
-        if "date" in joined and ("balance" in joined or "amount" in joined):
-            return i, row
-    raise ValueError("Header row not found")
-
-
-# ---------------------------------------------------
-# 3. Identify important column indices
-# ---------------------------------------------------
-
-def map_columns(headers):
-    col_map = {}
-
-    for i, h in enumerate(headers):
-        hl = h.lower()
-        if "date" in hl and "tran" not in hl:
-            col_map["date"] = i
-        elif any(k in hl for k in ["narration", "description", "details", "particular"]):
-            col_map["desc"] = i
-        elif "debit" in hl:
-            col_map["debit"] = i
-        elif "credit" in hl:
-            col_map["credit"] = i
-        elif "balance" in hl:
-            col_map["balance"] = i
-
-    return col_map
-
-
 # ---------------------------------------------------
-# 4. Merge split rows
-# ---------------------------------------------------
-
-def merge_split_rows(rows, col_map):
-    merged = []
-    prev = None
-
-    for row in rows:
-        row = row + [""] * (max(col_map.values()) + 1 - len(row))
-
-        date = row[col_map.get("date", -1)].strip()
-        bal = row[col_map.get("balance", -1)].strip()
-        desc = row[col_map.get("desc", -1)].strip()
-
-        # Continuation row logic
-        # if prev and (not date or not bal) and desc:
-        #     prev[col_map["desc"]] += " " + desc
-        #     continue
-
-        # Skip junk rows
-        # junk = desc.lower()
-        # if any(k in junk for k in ["b/f", "brought forward", "carry forward", "total"]):
-        #     continue
-
-        row_text = " ".join(row).lower()
-
-        if prev and (not date or not bal) and desc and "total" not in row_text:
-            prev[col_map["desc"]] += " " + desc
-            continue
-
-        if any(k in row_text for k in [
-            "total",
-            "subtotal",
-            "grand total",
-            "b/f",
-            "brought forward",
-            "c/f",
-            "carry forward"
-        ]):
-            continue
-
-        prev = row
-        merged.append(row)
-
-    return merged
-
-
-# ---------------------------------------------------
-# 5. Clean + normalize rows
-# ---------------------------------------------------
-
-def clean_transactions(rows, headers):
-    clean = []
-
-    for r in rows:
-        # 🔑 FINAL DEFENSIVE FILTER (ADD HERE)
-        full_text = " ".join(r).lower()
-        if any(k in full_text for k in ["total", "subtotal", "grand total", "b/f", "c/f", "carry forward"]):
-            continue
-
-        if not any(r):
-            continue
-
-        # Remove rows without any amount
-        amt_present = any(re.search(r"\d", r[i]) for i in range(len(r)))
-        if not amt_present:
-            continue
-
-        clean.append(dict(zip(headers, r)))
-
-    return pd.DataFrame(clean)
-
-
-# ---------------------------------------------------
-# 6. MAIN FUNCTION
+# MAIN FUNCTION
 # ---------------------------------------------------
 
 def extract_transactions_no_gpt(extracted_text, output_excel):
-    raw_rows = parse_ascii_table(extracted_text)
+    # Every account section / transaction table gets its own sheet
+    tables = parse_tables(extracted_text)
 
-    header_idx, headers = detect_header(raw_rows)
-    data_rows = raw_rows[header_idx + 1 :]
-
-    col_map = map_columns(headers)
-
-    merged_rows = merge_split_rows(data_rows, col_map)
-
-    df = clean_transactions(merged_rows, headers)
-
-    df.to_excel(output_excel, index=False)
+    write_tables(tables, output_excel)
     print(f"Saved: {output_excel}")
-    print(df.head())
+    for tag, df in tables:
+        print(f"\n{tag}: {len(df)} transactions")
+        print(df.head())
 
 
 # ---------------------------------------------------
-# 7. USAGE
+# USAGE
 # ---------------------------------------------------
 
-# extracted_text = resultx['extraction']['result_text']
-extract_transactions_no_gpt(
-    extracted_text,
-    OUTPUT_EXCEL
-)
+with MappedText(TEXT_PATH) as doc:
+    extract_transactions_no_gpt(
+        doc.iter_lines(),
+        OUTPUT_EXCEL
+    )
@@ -0,0 +1,208 @@
+import re
+
+import numpy as np
+
+
+# ---------------------------------------------------
+# Word-geometry table extraction for statements
+# without ruling lines
+# ---------------------------------------------------
+
+ROW_START_REGEX = r"\d{2}[-/]\d{2}[-/]\d{2,4}"
+HEADER_KEYWORDS = ["DATE"]
+
+
+def words_to_arrays(words):
+    """
+    pdfplumber word dicts -> (text list, x0, x1, top, bottom) arrays
+    """
+    n = len(words)
+    x0 = np.fromiter((w["x0"] for w in words), dtype=np.float64, count=n)
+    x1 = np.fromiter((w["x1"] for w in words), dtype=np.float64, count=n)
+    top = np.fromiter((w["top"] for w in words), dtype=np.float64, count=n)
+    bottom = np.fromiter((w["bottom"] for w in words), dtype=np.float64, count=n)
+    text = [w["text"] for w in words]
+    return text, x0, x1, top, bottom
+
+
+def group_lines(top, y_tolerance=3):
+    """
+    Line id for every word: words whose tops are within y_tolerance of the
+    previous word (in top order) share a line.
+    """
+    order = np.argsort(top, kind="stable")
+    breaks = np.diff(top[order]) > y_tolerance
+    line_sorted = np.concatenate(([0], np.cumsum(breaks)))
+    line_id = np.empty_like(line_sorted)
+    line_id[order] = line_sorted
+    return line_id
+
+
+def cluster_columns(x0, x1, min_gap=4):
+    """
+    Column boundaries from the union of word x-extents: wherever no word
+    covers a horizontal gap wider than min_gap, a column ends.
+    Returns the sorted boundary x positions (len = n_columns - 1).
+    """
+    if len(x0) == 0:
+        return np.empty(0)
+    order = np.argsort(x0, kind="stable")
+    left = x0[order]
+    reach = np.maximum.accumulate(x1[order])
+    gap = left[1:] - reach[:-1]
+    split = np.nonzero(gap > min_gap)[0]
+    return (reach[split] + left[split + 1]) / 2
+
+
+def split_on_header(boundaries, hx0, hx1, header_gap=12):
+    """
+    Body columns that touch (a date running into a narrow MODE column)
+    merge in cluster_columns. Two header words further apart than
+    header_gap with no boundary between them start separate columns, so
+    split just left of the second one.
+    """
+    if len(hx0) < 2:
+        return boundaries
+    order = np.argsort(hx0)
+    left, right = hx0[order], hx1[order]
+    wide = np.nonzero(left[1:] - right[:-1] > header_gap)[0]
+    cut = left[wide + 1] - 1
+    already = (np.searchsorted(boundaries, right[wide])
+               != np.searchsorted(boundaries, left[wide + 1]))
+    return np.sort(np.concatenate((boundaries, cut[~already])))
+
+
+def extract_word_table(page, row_start=ROW_START_REGEX, header_keywords=HEADER_KEYWORDS,
+                       y_tolerance=3, min_gap=4, valign="middle", x_tolerance=1):
+    """
+    Build a table (list of rows, header row first when found) from a page's
+    word boxes, in the same shape page.extract_tables() returns.
+    Lines starting with a row_start match open a new row; other lines that
+    sit between rows are wrapped text and are appended to a row's cells
+    with a newline, as pdfplumber does for multi-line cells.
+
+    valign="middle" (statements that centre the date/amount line within a
+    wrapped narration, e.g. ICICI) gives each wrapped line to the nearest
+    row; valign="top" gives it to the row above.
+
+    x_tolerance is tighter than pdfplumber's default so values printed
+    right up against the next column stay separate words.
+    """
+    words = page.extract_words(x_tolerance=x_tolerance)
+    if not words:
+        return []
+    return words_to_table(words, row_start, header_keywords, y_tolerance, min_gap, valign)
+
+
+def words_to_table(words, row_start=ROW_START_REGEX, header_keywords=HEADER_KEYWORDS,
+                   y_tolerance=3, min_gap=4, valign="middle"):
+    text, x0, x1, top, bottom = words_to_arrays(words)
+    line_id = group_lines(top, y_tolerance)
+
+    # Words ordered by line then x; first word of each line
+    order = np.lexsort((x0, line_id))
+    lines_sorted = line_id[order]
+    first = np.concatenate(([True], lines_sorted[1:] != lines_sorted[:-1]))
+    first_idx = order[first]
+    n_lines = len(first_idx)
+
+    start_re = re.compile(row_start)
+    is_body = np.fromiter(
+        (start_re.match(text[i]) is not None for i in first_idx), dtype=bool, count=n_lines
+    )
+    if not is_body.any():
+        return []
+
+    # Line geometry
+    line_top = np.full(n_lines, np.inf)
+    np.minimum.at(line_top, line_id, top)
+    line_bottom = np.zeros(n_lines)
+    np.maximum.at(line_bottom, line_id, bottom)
+
+    # Header: last line above the first body line mentioning every keyword
+    body_lines = np.nonzero(is_body)[0]
+    header_line = -1
+    line_text = {}
+    for i in order[lines_sorted < body_lines[0]]:
+        line_text.setdefault(line_id[i], []).append(text[i].upper())
+    for ln in range(body_lines[0] - 1, -1, -1):
+        joined = " ".join(line_text.get(ln, []))
+        if all(k in joined for k in header_keywords):
+            header_line = ln
+            break
+
+    # Column boundaries come from body lines plus the header line; wrapped
+    # narration lines often straddle columns and are left out.
+    anchor = is_body.copy()
+    if header_line >= 0:
+        anchor[header_line] = True
+    anchor_words = anchor[line_id]
+    boundaries = cluster_columns(x0[anchor_words], x1[anchor_words], min_gap)
+    if header_line >= 0:
+        on_header = line_id == header_line
+        boundaries = split_on_header(boundaries, x0[on_header], x1[on_header], min_gap * 3)
+    n_cols = len(boundaries) + 1
+    col_id = np.searchsorted(boundaries, (x0 + x1) / 2)
+
+    # Table extent: from the header (or first body line) to the last body
+    # line, plus wrapped lines right after it. A trailing line stops the
+    # table when it leaves the line pitch or puts text in a column that
+    # wrapped lines never use (a "Total:" row, footer text).
+    first_line = header_line if header_line >= 0 else body_lines[0]
+    last_body = body_lines[-1]
+    steps = np.diff(line_top[first_line:last_body + 1])
+    pitch = np.median(steps) if len(steps) else np.median(line_bottom - line_top)
+
+    in_body_span = (line_id > first_line) & (line_id < last_body)
+    wrap_cols = set(np.unique(col_id[in_body_span & ~anchor_words]).tolist())
+
+    last_line = last_body
+    for ln in range(last_body + 1, n_lines):
+        if line_top[ln] - line_top[last_line] > pitch * 2:
+            break
+        if not set(np.unique(col_id[line_id == ln]).tolist()) <= wrap_cols:
+            break
+        last_line = ln
+
+    # Every line in the table feeds one anchor (header/body) row
+    anchor_lines = np.nonzero(anchor[first_line:last_line + 1])[0] + first_line
+    anchor_tops = line_top[anchor_lines]
+    table_lines = np.arange(first_line, last_line + 1)
+    prev_anchor = np.searchsorted(anchor_tops, line_top[table_lines], side="right") - 1
+    if valign == "middle":
+        next_anchor = np.minimum(prev_anchor + 1, len(anchor_lines) - 1)
+        closer_next = (anchor_tops[next_anchor] - line_top[table_lines]
+                       < line_top[table_lines] - anchor_tops[prev_anchor])
+        closer_next &= ~anchor[table_lines]
+        prev_anchor = np.where(closer_next, next_anchor, prev_anchor)
+
+    row_of_line = np.full(n_lines, -1)
+    row_of_line[table_lines] = prev_anchor
+    n_rows = len(anchor_lines)
+
+    # Join words cell by cell: (row, column, line, x) ordering
+    keep = row_of_line[line_id] >= 0
+    idx = np.nonzero(keep)[0]
+    w_row = row_of_line[line_id[idx]]
+    w_col = col_id[idx]
+    w_line = line_id[idx]
+    cell_order = np.lexsort((x0[idx], w_line, w_col, w_row))
+
+    table = [[""] * n_cols for _ in range(n_rows)]
+    cur_key = None
+    cur_line = None
+    parts = []
+    for k in cell_order:
+        key = (w_row[k], w_col[k])
+        if key != cur_key:
+            if cur_key is not None:
+                table[cur_key[0]][cur_key[1]] = "".join(parts)
+            cur_key, cur_line, parts = key, w_line[k], [text[idx[k]]]
+            continue
+        parts.append("\n" if w_line[k] != cur_line else " ")
+        parts.append(text[idx[k]])
+        cur_line = w_line[k]
+    if cur_key is not None:
+        table[cur_key[0]][cur_key[1]] = "".join(parts)
+
+    return table